@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+import sys
+import os
+import getopt
+import subprocess
+import statistics
+
+"""
+Measure how long the emulator takes to start
+
+Each step is timed in a new Python process, so nothing is imported or
+cached in memory from the last run. Run it before and after a change, to
+see if the start got slower.
+"""
+
+# Folder of the emulator, so the printers package can be imported
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code to time in a new process, by name. Each one prints the number of seconds it took
+STEPS = {
+    'import renderer': """
+import time
+start = time.perf_counter()
+import printers.renderer
+print(time.perf_counter() - start)
+""",
+    'import printer.py': """
+import time
+start = time.perf_counter()
+import printer
+print(time.perf_counter() - start)
+""",
+    'select {printer}': """
+import time
+start = time.perf_counter()
+from printers.renderer import Renderer
+renderer = Renderer()
+renderer.select_printer('{printer}')
+print(time.perf_counter() - start)
+""",
+    'show window': """
+import time
+start = time.perf_counter()
+import printer
+try:
+    window = printer.Printer()
+except printer.tk.TclError:
+    print('')
+    raise SystemExit
+window.create_menu()
+window.root.update()
+print(time.perf_counter() - start)
+window.root.destroy()
+""",
+}
+
+PRINTERS = ['MPS 801', 'MPS 802', 'VIC 1520']
+
+def display_help():
+    print ('startup.py [-n <runs>]')
+    print ()
+    print ('Time the start of the emulator, each step in a new process.')
+    print ('The window is only timed if there is a display.')
+    sys.exit(2)
+
+"""
+Time a step in new processes
+
+code - Code of the step (See STEPS)
+runs - Number of times to run it
+
+Returns a list of times in seconds, or an empty list if the step was skipped
+"""
+def time_step(code, runs):
+    times = []
+    for run in range(runs):
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stderr, end='')
+            return []
+
+        output = result.stdout.strip()
+        if output == '':
+            return []
+        times.append(float(output.splitlines()[-1]))
+
+    return times
+
+def main(argv):
+    runs = 5
+
+    try:
+        opts, args = getopt.getopt(argv,"hn:",["runs="])
+    except getopt.GetoptError:
+        display_help()
+
+    for opt, arg in opts:
+        if opt == '-h':
+            display_help()
+        elif opt in ("-n", "--runs"):
+            try:
+                runs = int(arg)
+            except ValueError:
+                display_help()
+
+    # Expand the steps that are done for each printer
+    steps = []
+    for name, code in STEPS.items():
+        if '{printer}' in name:
+            for printer in PRINTERS:
+                steps.append((name.format(printer=printer), code.format(printer=printer)))
+        else:
+            steps.append((name, code))
+
+    print('{s:<20} {m:>10} {b:>10}'.format(s='Step', m='Median ms', b='Best ms'))
+    for name, code in steps:
+        times = time_step(code, runs)
+        if len(times) == 0:
+            print('{s:<20} {m:>10}'.format(s=name, m='skipped'))
+        else:
+            print('{s:<20} {m:>10.1f} {b:>10.1f}'.format(s=name, m=statistics.median(times) * 1000, b=min(times) * 1000))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
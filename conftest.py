@@ -0,0 +1 @@
+# Lets the tests import the printers package from the top of the repository
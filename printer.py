@@ -3,19 +3,15 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog
 from tkinter.constants import NW
-from PIL import Image, ImageDraw
-import serial
-import serial.tools.list_ports
 import sys
 import os
 import getopt
 import platform
 
-from pynput.keyboard import Key, Controller
-
-from printers.mps801 import mps801
-from printers.mps802 import mps802
-from printers.vic1520 import vic1520
+# pyserial and pynput are imported when they are first used,
+# so the window is shown sooner
+from printers.renderer import Renderer
+from printers.serial_reader import serial_reader
 
 from printers.printer_constants import *
 
@@ -23,59 +19,46 @@ DEFAULT_PRINTER = "VIC 1520"
 
 class Printer:
     def __init__(self):
-        self.printer_profile = None
-
-        self.img = None
+        # The renderer does all the printing, and this window displays it
+        self.renderer = Renderer(self)
 
-        self.page_current = 0
-        self.page_data = []
-        self.page_last = 0
+        # Display updates are done in frames, not for every byte
+        self.frame = None
+        self.follow_print = False
+        self.segments_drawn = 0
+        self.plot_bands = None
 
-        # Add buffer for the current page
-        self.page_data.append(bytearray())
-        self.page_data[self.page_current].append(0)
+        # Simulates key presses for the mouse wheel, made when it is first used
+        self.keyboard = None
 
-        self.keyboard = Controller()
+        # Serial port, and the thread that reads it in the background
+        self.serial_port = None
+        self.ser = None
+        self.reader = None
 
         self.printer_selected = DEFAULT_PRINTER
 
         self.create_ui()
 
     def select_printer(self, printer):
-        if printer == 'MPS 801':
-            self.printer_profile = mps801()
-        if printer == 'MPS 802':
-            self.printer_profile = mps802()
-        if printer == 'VIC 1520':
-            self.printer_profile = vic1520()
-
-        self.printer_profile.set_parent(self)
+        self.renderer.select_printer(printer)
 
     def refresh_ui(self):
         x = self.root.winfo_x() - 12
         y = self.root.winfo_y() - 90
 
-        page_width = self.printer_profile.page_width
-        page_height = self.printer_profile.page_height
+        page_width = self.renderer.printer_profile.page_width
+        page_height = self.renderer.printer_profile.page_height
         self.root.title(self.printer_select.get())
         self.root.geometry("{width}x{height}".format(width=(page_width*SIZE)+25,height=MIN_Y, x=x, y=y))
         self.root.resizable(False,True)
         self.root.minsize(500,MIN_Y)
         self.root.maxsize((page_width*SIZE)+25,2000)
 
-        # Create an image to draw the output on
-        #white = 
-        self.image = None
-        self.image = Image.new(
-            "RGB",
-            (self.printer_profile.page_width*OUTPUT_SIZE,self.printer_profile.page_height*OUTPUT_SIZE),
-            color = (255, 255, 255) # type: ignore
-        ) # type: ignore
-
-        # Load the bitmap to draw the pixel
-        self.draw = ImageDraw.Draw(self.image)
+        # Resize the image of the page
+        self.photo.configure(width=page_width*SIZE, height=page_height*SIZE)
 
-    def child_widgets(self, width, height, size, output_size):
+    def child_widgets(self, width, height, size):
         # Create the frame to contain the combobox
         self.control_frame=tk.Frame()
             #self.root,width=self.printer_profile.font_width*SIZE,height=100,padx=5,pady=5)
@@ -110,21 +93,14 @@ class Printer:
             orient=tk.VERTICAL
         )
 
-        # Create an image to draw the output on
-        #white = 
-        self.image = Image.new(
-            "RGB",
-            (width*output_size,height*output_size),
-            color = (255, 255, 255) # type: ignore
-        ) # type: ignore
-
-        # Load the bitmap to draw the pixel
-        self.pixel = Image.open('printers/printer_pixel.png')
-        self.draw = ImageDraw.Draw(self.image)
+        # Create the image that shows the dots of the page. This is one
+        # item on the canvas, no matter how many dots are printed
+        self.photo = tk.PhotoImage(width=width*size, height=height*size)
+        self.canvas.create_image(0, 0, anchor=NW, image=self.photo)
 
         self.vbar.config(command=self.canvas.yview)
         self.canvas.config(width=width*size,height=height*size)
-        self.canvas.config(yscrollcommand=self.vbar.set)
+        self.canvas.config(yscrollcommand=self.on_scroll)
 
         #self.control_frame.pack()
         self.canvas_frame.pack(expand=True, fill=tk.BOTH)
@@ -148,10 +124,9 @@ class Printer:
 
     def create_ui(self):
 
-        # Create root window
-        self.select_printer(self.printer_selected)
-        page_width = self.printer_profile.page_width
-        page_height = self.printer_profile.page_height
+        # Create root window. The printer is selected once the window
+        # is shown (See start_input), so it is sized from the page size
+        page_width, page_height = PAGE_SIZES[self.printer_selected]
         self.root = tk.Tk()
         self.root.title(self.printer_selected)
         self.root.geometry("{width}x{height}".format(width=(page_width*SIZE)+25,height=MIN_Y))
@@ -162,115 +137,102 @@ class Printer:
         self.printer_select = tk.StringVar()
         self.printer_select.set(self.printer_selected)
 
-        self.child_widgets(page_width, page_height, SIZE, OUTPUT_SIZE)
+        self.child_widgets(page_width, page_height, SIZE)
 
-    # Clear the canvas and image
+    # Clear the canvas
     def clear_canvas(self):
-        self.canvas.delete("all")
-        self.draw.rectangle([0, 0, self.printer_profile.page_width*OUTPUT_SIZE,self.printer_profile.page_height*OUTPUT_SIZE], fill='white', outline=None, width=1)
-
-    # Redraw the currently selected page
-    def redraw_page(self):
-
-        # Clear the canvas
-        self.clear_canvas()
+        self.canvas.delete("plot")
+        self.photo.blank()
+        self.segments_drawn = 0
+        self.plot_bands = None
 
         # Move scrollbar to the top of the page
         self.canvas.yview("moveto", 0.0)
 
-        # Get the current page data
-        pd = self.page_data[self.page_current]
-
-        # Get the length of the page data
-        pd_len = len(pd)
-
-        # Set x and y to the top of the page
-        self.printer_profile.x = pd[0]
-        self.printer_profile.y = 0
-
-        # Process all the data for the page
-        for c in range(1,pd_len):
-            i = pd[c]
-            if self.printer_profile.graph_mode == False and i == FF:
-                pass
-            else:
-                self.printer_profile.chout(i, add_data=False)
-
-
-    # Create a new page
-    def new_page(self):
-        # Move to the top of the page
-        self.canvas.yview("moveto", 0.0)
-
-        # New page in the combobox
+    # Add a new page to the combobox, and select it
+    def add_page(self, page):
         values = self.page['values']
         current_values = list(values)
-        self.page_current += 1
-        self.page['values'] = current_values + ["Page {pg}".format(pg=self.page_current+1)]
+        self.page['values'] = current_values + ["Page {pg}".format(pg=page+1)]
         self.page.update()
 
-        # Clear the canvas
-        self.clear_canvas()
-
-        # Add data array to the page
-        self.page_data.append(bytearray())
-        self.page_data[self.page_current].append(0)
-
         # Set the combobox to the new page
-        self.page.current(self.page_current)
-
-        # Set the x and y position to the top of the page
-        self.printer_profile.x = 0
-        self.printer_profile.y = 0
-
-    # Draw a dot on the canvas and image
-    def draw_dot(self, display_offset, output_offset):
-
-        # Draw pixels for the display
-        self.canvas.create_rectangle(
-            self.printer_profile.x,
-            self.printer_profile.y+display_offset,
-            self.printer_profile.x+(SIZE * self.printer_profile.char_width),
-            self.printer_profile.y+(SIZE)+display_offset,
-            fill='black',
-            outline=''
-        )
+        self.page.current(page)
 
-        # Draw the pixels for the output
-        Image.Image.paste(
-            self.image,
-            self.pixel,
-            (int(self.printer_profile.x * OUTPUT_MULIPLIER), int(self.printer_profile.y * OUTPUT_MULIPLIER + output_offset))
-        )
-
-        # If it is double width, draw a second pixel
-        if self.printer_profile.char_width != NORMAL_WIDTH:
-            Image.Image.paste(
-                self.image,
-                self.pixel,
-                (int(self.printer_profile.x * OUTPUT_MULIPLIER) + OUTPUT_MULIPLIER, int(self.printer_profile.y * OUTPUT_MULIPLIER + output_offset))
-            )
+    # Set the combobox to the page
+    def select_page(self, page):
+        self.page.current(page)
 
-        #self.draw.rectangle([self.printer_profile.x * OUTPUT_MULIPLIER, self.printer_profile.y * OUTPUT_MULIPLIER + output_offset, self.printer_profile.x * OUTPUT_MULIPLIER + (OUTPUT_SIZE * self.char_width)-1, self.printer_profile.y * OUTPUT_MULIPLIER +(OUTPUT_SIZE)+output_offset-1], fill='black', outline=None, width=1)
+    # Called by the renderer when the page has changed
+    def refresh(self):
+        self.schedule_frame()
 
-    # Output one vertical line of the character
-    def output_byte(self, byte):
-        display_offset = 0
-        output_offset = 0
-        for bit in range(0,self.printer_profile.font_height):
-            bit_value = pow(2, bit)
-            if (byte & bit_value == bit_value): self.draw_dot(display_offset, output_offset)
-
-            display_offset += SIZE
-            output_offset += OUTPUT_SIZE
+    # Called by the renderer when the print position has moved
+    def set_scroll(self):
+        self.follow_print = True
+        self.schedule_frame()
+
+    # Schedule the display to be updated, at most FRAME_RATE times a second
+    def schedule_frame(self):
+        if self.frame is None:
+            self.frame = self.root.after(1000 // FRAME_RATE, self.draw_frame)
+
+    # Update the display with the changes since the last frame
+    def draw_frame(self):
+        self.frame = None
+
+        # Copy the region of the page that has changed to the image
+        dirty = self.renderer.take_dirty()
+        if dirty is not None:
+            top, left, bottom, right = dirty
+            data = self.renderer.display_image(top, left, bottom, right)
+            self.photo.tk.call(self.photo.name, 'put', data, '-format', 'ppm', '-to', left * SIZE, top * SIZE)
+
+        # Follow the print position
+        if self.follow_print:
+            self.follow_print = False
+            self.scroll_to_print()
+
+        self.draw_plot()
+
+    # Draw the plotter lines that can be seen in the canvas
+    def draw_plot(self):
+        display_list = self.renderer.display_list
+
+        # Get the bands of the page that are in view
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        bands = display_list.band_range(top, bottom)
+
+        # If we scrolled to other bands, start over with the lines in view,
+        # otherwise only draw the new lines
+        start = self.segments_drawn
+        if bands != self.plot_bands:
+            self.canvas.delete("plot")
+            self.plot_bands = bands
+            start = 0
+
+        if start < len(display_list):
+            for color, points in display_list.polylines(display_list.find(bands, start)):
+                self.canvas.create_line(*points, fill=color, width=2, capstyle=tk.ROUND, joinstyle=tk.ROUND, tags="plot")
+            self.segments_drawn = len(display_list)
+
+    # Callback for the canvas being scrolled
+    def on_scroll(self, first, last):
+        self.vbar.set(first, last)
+
+        # Draw the lines that came into view
+        self.schedule_frame()
 
     # Set the scroll position at the bottom of the output
-    def set_scroll(self):
+    def scroll_to_print(self):
         # Get the width of the window frame
         w = self.canvas_frame.winfo_height()
 
+        printer_profile = self.renderer.printer_profile
+
         # Calculate the scrollbar percentage based on the printed line
-        scroll =((self.printer_profile.y)-w)/((self.printer_profile.page_height*SIZE))
+        scroll =((printer_profile.y)-w)/((printer_profile.page_height*SIZE))
 
         # If the scrollbar percentage is greater than 100% set it to 100%
         # This should never happen
@@ -281,56 +243,28 @@ class Printer:
 
     # Output a string
     def output_string(self, str):
-        for i in str: self.printer_profile.chout(ord(i))
-        self.canvas.update()
+        self.renderer.write([ord(i) for i in str])
 
     # Callback for the the combo box change
     def on_field_change(self, event):
         # Get the current page and redraw it
-        self.page_current = self.page.current()
-        self.redraw_page()
+        self.renderer.page_current = self.page.current()
+        self.renderer.redraw_page()
 
     # Callback to save the output
     def saveCallBack(self):
-        # Save the current page
-        current_page = self.page_current
-
-        # Iterate through the pages
-        for i in range(0,len(self.page_data)):
-
-            # Set the current page to the index and redraw, 
-            # and save it
-            self.page_current = i
-            self.redraw_page()
-            self.image.save('output_{page}.png'.format(page=i))
-
-        # Restore the current page and redraw it
-        self.page_current = current_page
-        self.redraw_page()
-
-        # Get a list of the image files that we produced
-        files = []
-        for i in range(0,len(self.page_data)):
-            files.append('output_{page}.png'.format(page=i))
-
-        # Load the images
-        images = [
-            Image.open("./" + f)
-            for f in files
-        ]
-
-        # Save the images as PDF
-        images[0].save(
-            self.output_file,
-            "PDF",
-            resolution=100.0,
-            save_all=True,
-            append_images=images[1:]
-        )
+        # Plots can also be saved as SVG, and pages as TIFF
+        if self.output_file.lower().endswith('.svg'):
+            self.renderer.save_svg(self.output_file)
+        elif self.output_file.lower().endswith(('.tif', '.tiff')):
+            self.renderer.save_tiff(self.output_file)
+        else:
+            # A few pages are quicker to draw here than in other processes
+            processes = os.cpu_count() or 1
+            if self.renderer.unsaved_pdf_pages(self.output_file) < PARALLEL_PAGES:
+                processes = 1
 
-        # Delete the image files
-        for f in files:
-            os.unlink(f)
+            self.renderer.save_pdf(self.output_file, processes)
 
     # Callback for the frame being resized: Todo
     def resize(self, event):
@@ -340,145 +274,46 @@ class Printer:
             # Set the scroll position
             #self.set_scroll()
 
-    # Serial read task gets called from main loop
-    def serial_read(self):
-        try:
-            # While there is something on the serial port
-            while self.ser.inWaiting() > 0: # type: ignore
-
-                # If the current page is not the last page
-                if self.page.current() != len(self.page_data)-1:
-                    # Set page to the last page to output to it
-                    self.page.current(len(self.page_data)-1)
-                    self.page_current = self.page.current()
-
-                    # Redraw the page
-                    self.redraw_page()
-
-                # Send the character for output
-                ch = self.ser.read(1)[0] # type: ignore
-                self.printer_profile.chout(ch)
-
-            # reschedule event in 20 milliseconds
-            self.root.after(20, self.serial_read)
-        except OSError:
-            print("Serial port has been disconnected")
-            self.serial.set("")
-            self.serial_port = None
-            self.refresh_menu()
-            return
-
-    # Get a block of text from from the line
-    def get_block(self, line):
-
-        # Start at 0
-        cnt = 0
-
-        # Find the start of the block or a comment
-        while cnt < len(line) and (line[cnt] != '{' and line[cnt] != '#'):
-            cnt += 1
-
-        # We found a comment, return
-        if cnt < len(line):
-            if line[cnt] == '#': return ['','']
-
-            # Get the line from the current position
-            block = line[cnt:]
-
-            # Get end of the block
-            cnt = 0
-            while cnt < len(block) and block[cnt] != '}':
-                cnt += 1
-
-            # Get the block
-            block = block[:cnt+1]
-
-            # Remove the block from the line
-            line = line[cnt+1:]
-        else:
-            block = ''
-            line = ''
-
-        return [block, line]
-
-    # Process the block
-    def process_block(self, block):
+    # Start reading the serial port in the background, and printing what is read
+    def start_serial(self):
+        self.reader = serial_reader(self.ser)
+        self.root.after(20, self.serial_read, self.reader)
 
-        # Remove the end of block
-        block = block[0:len(block)-1]
+    # Stop reading the serial port, and close it
+    def stop_serial(self):
+        if self.reader is not None:
+            self.reader.stop()
+            self.reader = None
 
-        # If string mode
-        if block[0:2] == "{*":
-
-            # Remove the start of block
-            block = block[2:]
-
-            # Print the output until the end of the block
-            cnt = 0
-            while  cnt < len(block):
-                self.printer_profile.chout(ord(block[cnt]))
-                cnt += 1
-
-            return
-
-        # If hex mode
-        if block[0:2] == "{x":
-            # Remove the start of the block
-            block = block[2:]
+        if self.ser is not None:
+            self.ser.close()
+            self.ser = None
 
-            # Remove any spaces in the block
-            block = block.replace(" ", "")
+    # Serial read task gets called from main loop
+    def serial_read(self, reader):
+        # The port has been changed
+        if reader is not self.reader: return
 
-            # Make an even set up hex numbers
-            if len(block) % 2 == 2: block += '0'
+        # Send a chunk of what was read for output. If the current page
+        # is not the last page, the renderer will go back to it
+        self.renderer.write(reader.read(SERIAL_CHUNK))
 
-            # Output each of the hex numbers
-            for i in range(0,len(block),2):
-                value = int(block[i:i+2],16)
-                self.printer_profile.chout(value)
+        # Stop when everything that was read before the port failed is printed
+        if reader.error is not None and len(reader) == 0:
+            print("Serial port has been disconnected")
+            self.stop_serial()
+            self.serial.set("")
+            self.serial_port = None
+            self.refresh_menu()
             return
 
-        # If decimal character mode
-        if block[0] == '{':
-
-            # Remove the start of the block
-            block = block[ 1:]
-
-            # Remove any spaces in the block
-            block = block.replace(" ", "")
-
-            # Split the values on comma
-            ch_list = block.split(',')
-
-            # Print the output
-            for c in ch_list:
-                self.printer_profile.chout(int(c))
-
+        # Come back for the next chunk after the display is updated,
+        # or in 20 milliseconds if we are waiting for more
+        self.root.after(1 if len(reader) > 0 else 20, self.serial_read, reader)
 
     # Read the data file, and process each block
     def read_data_file(self, data_file):
-
-        # Open the file and read the lines
-        with open(data_file) as f:
-            lines = f.read().splitlines()
-
-        # for each line process the block
-        for line in lines:
-
-            # Remove leading and trailing spaces
-            line = line.strip(' ')
-
-            # While we have data in the line
-            while len(line) > 0:
-
-                # Get the block and the left over line
-                result = self.get_block(line)
-                block = result[0]
-                line = result[1]
-
-                # If we have a block process it
-                if (len(block) > 0):
-                    self.process_block(block)
+        self.renderer.read_data_file(data_file)
 
     def donothing(self):
         pass
@@ -503,7 +338,7 @@ class Printer:
         # Display dialog to get the file to save
         f = filedialog.asksaveasfilename(
             defaultextension=".pdf",
-            filetypes=[("Acrobat File","*.pdf"),("All Files","*.*")]
+            filetypes=[("Acrobat File","*.pdf"),("SVG File","*.svg"),("TIFF File","*.tif"),("All Files","*.*")]
         )
 
         # If the dialog box with closed or canceled return
@@ -548,7 +383,7 @@ class Printer:
             cnt = 0
 
             # Iterate through the page data
-            for pd in self.page_data:
+            for pd in self.renderer.page_data:
 
                 # Iterate through the character data of the page data
                 for ch in pd[1:]:
@@ -609,20 +444,7 @@ class Printer:
 
         # If we didn't cancel, read the file
         if file_path:
-            # Open the file and read the lines
-            with open(file_path) as f:
-                lines = f.read().splitlines()
-
-            # for each line process the block
-            for line in lines:
-
-                # Remove leading and trailing spaces
-                line = line.replace(' ','')
-
-                for h in range(0,len(line),2):
-                    c = int(line[h:h+2],16)
-                    self.printer_profile.chout(c)
-
+            self.renderer.read_hex_file(file_path)
 
 
     # Save the print data as binary
@@ -643,7 +465,7 @@ class Printer:
 
             cnt = 0
             # Iterate through the page data
-            for pd in self.page_data:
+            for pd in self.renderer.page_data:
 
                 # Iterate through the character data of the page data
                 for ch in pd[1:]:
@@ -661,33 +483,24 @@ class Printer:
 
     # Clear the output from the pages
     def clear_output(self):
-        # Clear the canvas
-        self.clear_canvas()
-
-        # Add buffer for the current page
-        self.page_data = []
-        self.page_data.append(bytearray())
-        self.page_data[self.page_current].append(0)
-
-        # Reset all the values
-        self.printer_profile.x = 0
-        self.printer_profile.y = 0
-        self.page_current = 0
-        self.x_last = 0
-        self.y_last = 0
-        self.page_last = 0
-
-        self.printer_profile.clear_output()
+        # Clear the pages and reset the printer
+        self.renderer.clear_output()
 
         # Reset the combobox
         self.page['values'] = ('Page\\ 1')
         self.page.current(0)
 
+    # Open a serial port
+    def open_serial(self, port):
+        import serial
+        return serial.Serial(port=port,baudrate=115200)
+
     # Get the current serial ports
     def get_serial_ports(self):
+        from serial.tools import list_ports
 
         # Get the ports from the serial tool
-        ports = serial.tools.list_ports.comports()
+        ports = list_ports.comports()
 
         # Initialize the port list
         p = []
@@ -709,18 +522,17 @@ class Printer:
         if self.serial_port != self.serial.get():
 
             # Close the old port
-            if self.ser is not None:
-                self.ser.close()
+            self.stop_serial()
 
             # Get serial ports name
             self.serial_port = self.serial.get()
 
             # Open the port
-            self.ser = serial.Serial(port=self.serial_port,baudrate=115200)
+            self.ser = self.open_serial(self.serial_port)
             print("Opened serial port",self.serial_port)
 
-            # Set the time to read from the serial port
-            self.root.after(20, self.serial_read)
+            # Start reading from the serial port
+            self.start_serial()
 
     # Refrest the serial ports on the menu
     def refresh_menu(self):
@@ -754,11 +566,11 @@ class Printer:
                 self.serial.set(self.serial_port)
 
                 # Open that serial port
-                self.ser = serial.Serial(port=self.serial_port,baudrate=115200)
+                self.ser = self.open_serial(self.serial_port)
                 print("Opened serial port",self.serial_port)
 
-                # Start the timer to read from the serial port
-                self.root.after(20, self.serial_read)
+                # Start reading from the serial port
+                self.start_serial()
             else:
                 # If we have more than one serial port, to select any
                 self.ser = None
@@ -769,11 +581,19 @@ class Printer:
         self.refresh_ui()
         pass
 
+    # Set the resolution of the saved pages
+    def set_quality(self):
+        self.renderer.set_dpi(OUTPUT_QUALITY[self.quality.get()])
+
     def create_menu(self):
 
         # Variable for the serial port
         self.serial = tk.StringVar()
 
+        # Variable for the output quality
+        self.quality = tk.StringVar()
+        self.quality.set('Normal')
+
         # Add the menu
         self.menubar = tk.Menu(self.root)
 
@@ -802,25 +622,18 @@ class Printer:
         self.printer_menu.add_radiobutton(label="VIC 1520", value="VIC 1520", variable=self.printer_select, command=self.set_printer)
         self.menubar.add_cascade(label="Printer", menu=self.printer_menu)
 
-        # Serial menu
-        self.serial_menu = tk.Menu(self.menubar, tearoff=0)
+        # Output quality menu
+        self.quality_menu = tk.Menu(self.menubar, tearoff=0)
+        for quality, dpi in OUTPUT_QUALITY.items():
+            self.quality_menu.add_radiobutton(label="{q} ({d} DPI)".format(q=quality, d=dpi), value=quality, variable=self.quality, command=self.set_quality)
+        self.menubar.add_cascade(label="Output", menu=self.quality_menu)
 
-        # Get the serial ports
-        s = self.get_serial_ports()
+        # Serial menu, the ports are added once the window is shown (See start_input)
+        self.serial_menu = tk.Menu(self.menubar, tearoff=0)
 
         # Add refresh submenu
         self.serial_menu.add_command(label="Refresh", command=self.refresh_menu)
 
-        # If there are any serial ports
-        if len(s) > 0:
-
-            # Add separator before the ports
-            self.serial_menu.add_separator()
-
-            # Add the ports
-            for i in s:
-                self.serial_menu.add_radiobutton(label=i[1], value=i[0], variable=self.serial, command=self.serial_port_change)
-
         # Add the menu item
         self.menubar.add_cascade(label="Serial Port", menu=self.serial_menu)
         self.root.config(menu=self.menubar)
@@ -834,6 +647,10 @@ class Printer:
             self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
         else:
             # Process for Linux
+            from pynput.keyboard import Key, Controller
+            if self.keyboard is None:
+                self.keyboard = Controller()
+
             if event.num == 4:
                 self.keyboard.press(Key.up)
                 self.keyboard.release(Key.up)
@@ -842,6 +659,28 @@ class Printer:
                 self.keyboard.press(Key.down)
                 self.keyboard.release(Key.down)
 
+    # Select the printer, read the data file, and open the serial port for input
+    def start_input(self, serial_port, data_file):
+        # Load the printer profile and its fonts
+        self.select_printer(self.printer_selected)
+
+        # Process the input file, if it is specified
+        if data_file is not None:
+            self.canvas.update()
+            self.read_data_file(data_file)
+            self.canvas.update()
+
+        # Open the serial port, if it is specified
+        self.serial_port = serial_port
+        if self.serial_port is not None:
+            self.ser = self.open_serial(serial_port)
+            self.start_serial()
+            self.serial.set(serial_port)
+
+        # Add the serial ports to the menu. If no port was specified,
+        # and there is only one, it is opened
+        self.refresh_menu()
+
     # Run the printer application
     def run(self, serial_port, data_file, output_file):
         # Create the menu
@@ -860,28 +699,9 @@ class Printer:
             self.canvas.bind_all("<Button-4>", self.on_mousewheel)
             self.canvas.bind_all("<Button-5>", self.on_mousewheel)
 
-        # Process the input file, if it is specified
-        if data_file is not None:
-            self.canvas.update()
-            self.read_data_file(data_file)
-            self.canvas.update()
-
-        # Open the serial port for input
-        self.serial_port = serial_port
-        if self.serial_port is not None:
-            self.ser = serial.Serial(port=serial_port,baudrate=115200)
-            self.root.after(20, self.serial_read)
-            self.serial.set(serial_port)
-        else:
-            p = self.get_serial_ports()
-            if len(p) == 1:
-                self.ser = serial.Serial(port=p[0][0],baudrate=115200)
-                self.serial_port = p[0][0]
-                self.serial.set(self.serial_port)
-                print("Opened serial port",p[0][0])
-                self.root.after(20, self.serial_read)
-            else:
-                self.ser = None
+        # Select the printer, read the data file and open the
+        # serial port once the window is shown
+        self.root.after_idle(self.start_input, serial_port, data_file)
 
         self.output_file = "output.pdf"
         if output_file is not None:
@@ -893,8 +713,12 @@ class Printer:
         # Run the main loop
         self.root.mainloop()
 
-        if self.ser is not None:
-            self.ser.close()
+        # Close the output file, if it is open, and stop the processes
+        # that draw its pages
+        self.renderer.close_pdf()
+        self.renderer.close_pool()
+
+        self.stop_serial()
 
 def display_help():
     print ('printer.py [-s <serial port>] -f <data file>')
@@ -0,0 +1,120 @@
+from bisect import bisect_left
+
+# Height of the bands of the spatial index, in display coordinates
+BAND_HEIGHT = 128
+
+"""
+List of the lines drawn by the plotter on a page
+
+Every segment is a tuple of (x1, y1, x2, y2, color), in display
+coordinates, in the order they were drawn.
+
+The segments are also indexed by bands of BAND_HEIGHT, so the segments
+in part of the page can be found without looking at all of them.
+"""
+class display_list:
+    def __init__(self):
+        self.segments = []
+        self.bands = {}
+
+    def __len__(self):
+        return len(self.segments)
+
+    # Add a line to the list
+    def add(self, x1, y1, x2, y2, color):
+        index = len(self.segments)
+        self.segments.append((x1, y1, x2, y2, color))
+
+        # Add it to every band it goes through
+        first, last = self.band_range(min(y1, y2), max(y1, y2))
+        for band in range(first, last + 1):
+            self.bands.setdefault(band, []).append(index)
+
+    """
+    Add a list of lines, each one (x1, y1, x2, y2, color)
+
+    The lines of a character are close together, so they are usually
+    all in one band, and can be added to it at once.
+    """
+    def extend(self, lines):
+        if len(lines) == 0: return
+
+        top = min(min(line[1], line[3]) for line in lines)
+        bottom = max(max(line[1], line[3]) for line in lines)
+        first, last = self.band_range(top, bottom)
+
+        index = len(self.segments)
+        self.segments.extend(lines)
+        if first == last:
+            self.bands.setdefault(first, []).extend(range(index, len(self.segments)))
+            return
+
+        # Otherwise add each line to the bands it goes through
+        for x1, y1, x2, y2, color in lines:
+            for band in range(int(min(y1, y2) // BAND_HEIGHT), int(max(y1, y2) // BAND_HEIGHT) + 1):
+                self.bands.setdefault(band, []).append(index)
+            index += 1
+
+    """
+    Get the first and last band between two y coordinates
+
+    top - Top y coordinate
+    bottom - Bottom y coordinate
+    """
+    def band_range(self, top, bottom):
+        return (int(top // BAND_HEIGHT), int(bottom // BAND_HEIGHT))
+
+    """
+    Find the segments in a range of bands
+
+    bands - First and last band (See band_range)
+    start - Only find segments from this index on
+
+    Returns a sorted list of segment indexes
+    """
+    def find(self, bands, start = 0):
+        found = set()
+        for band in range(bands[0], bands[1] + 1):
+            indexes = self.bands.get(band)
+            if indexes is not None:
+                # The indexes are in order, so skip the ones before start
+                found.update(indexes[bisect_left(indexes, start):])
+
+        return sorted(found)
+
+    """
+    Join the segments into polylines
+
+    Segments that start where the last one ended, with the same color,
+    are put in the same polyline.
+
+    indexes - Indexes of the segments to join, or None for all of them
+
+    Returns a list of (color, [x1, y1, x2, y2, x3, y3, ...])
+    """
+    def polylines(self, indexes = None):
+        if indexes is None:
+            return join_segments(self.segments)
+
+        return join_segments([self.segments[i] for i in indexes])
+
+"""
+Join a list of segments into polylines
+
+segments - List of (x1, y1, x2, y2, color)
+"""
+def join_segments(segments):
+    lines = []
+    points = None
+    last = None
+    for x1, y1, x2, y2, color in segments:
+        if points is not None and last == (x1, y1, color):
+            points.append(x2)
+            points.append(y2)
+        else:
+            points = [x1, y1, x2, y2]
+            lines.append((color, points))
+
+        last = (x2, y2, color)
+
+    return lines
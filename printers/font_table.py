@@ -0,0 +1,188 @@
+import os
+from array import array
+
+# Number of character codes in a font
+FONT_CODES = 256
+
+# Source of the fonts (See fonts.py)
+FONT_SOURCE = os.path.join(os.path.dirname(__file__), 'fonts.py')
+
+# Folder the compiled fonts are saved in, next to the compiled modules
+FONT_CACHE = os.path.join(os.path.dirname(__file__), '__pycache__')
+
+# Fonts that have been loaded, by name
+loaded_fonts = {}
+
+# Translation from control code to display code
+control_character = {
+    147 : 0xD3, # CLR           0x93
+     19 : 0x53, # HOME          0x13
+    145 : 0xD1, # UP            0x90
+     17 : 0x51, # DOWN          0x11
+    157 : 0xDD, # LEFT          0x9D
+     29 : 0x5D, # RIGHT         0x1D
+     18 : 0x52, # RVS           0x12
+    146 : 0xD2, # RVS OFF       0x92
+    144 : 0xD0, # BLK           0x90
+      5 : 0x45, # WHT           0x05
+     28 : 0x5C, # RED           0x1C
+    159 : 0xDF, # CYN           0x9F
+    156 : 0xDC, # PUR           0x9B
+     30 : 0x5E, # GRN           0x1E
+     31 : 0x5F, # BLU           0x1F
+    158 : 0xDE, # YEL           0x9E
+    129 : 0xC1, # ORG     C 1   0x81
+    149 : 0xD5, # BRN     C 2   0x95
+    150 : 0xD6, # PNK     C 3   0x96
+    151 : 0xD7, # DRK GRY C 4   0x97
+    152 : 0xD8, # MED GRY C 5   0x98
+    153 : 0xD9, # LIG GRN C 6   0x99
+    154 : 0xDA, # LIG BLU C 7   0x9A
+    155 : 0xDB, # LIG GRY C 8   0x9B
+    133 : 0xC5, # F1            0x85
+    137 : 0xC9, # F2 (SHIFT F1) 0x89
+    134 : 0xC6, # F3            0x86
+    138 : 0xCA, # F4 (SHIFT F3) 0x8A
+    135 : 0xC7, # F5            0x87
+    139 : 0xCB, # F6 (SHIFT F5) 0x8B
+    136 : 0xC8, # F7            0x88
+    140 : 0xCC, # F8 (SHIFT F7) 0x8C
+     20 : 0x54, # DEL           0x14
+    148 : 0xD4  # INS           0x94
+}
+
+"""
+Font compiled into one block of bytes
+
+The bytes of all the characters are put one after the other in data, and
+offsets has where each character starts, with one more offset at the end.
+A character that is not in the font has no bytes.
+
+It can be used like the dictionaries in fonts.py, to get the bytes of a
+character, check if a character is in the font, and go through the
+characters.
+
+offsets - Array of FONT_CODES + 1 offsets
+data - Bytes of the characters
+"""
+class font_table:
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __getitem__(self, ch):
+        start = self.offsets[ch]
+        end = self.offsets[ch + 1]
+        if start == end:
+            raise KeyError(ch)
+        return self.data[start:end]
+
+    def __contains__(self, ch):
+        return 0 <= ch < FONT_CODES and self.offsets[ch] != self.offsets[ch + 1]
+
+    def __iter__(self):
+        return (ch for ch in range(FONT_CODES) if ch in self)
+
+    def __len__(self):
+        return sum(1 for ch in self)
+
+    # Get the table as bytes, to save it (See from_bytes)
+    def to_bytes(self):
+        return self.offsets.tobytes() + self.data
+
+"""
+Make a font table from bytes saved with to_bytes
+
+raw - Saved bytes
+
+Returns the table, or None if the bytes are not a font table
+"""
+def from_bytes(raw):
+    offsets = array('H')
+    header = (FONT_CODES + 1) * offsets.itemsize
+    if len(raw) < header:
+        return None
+
+    offsets.frombytes(raw[:header])
+    data = raw[header:]
+    if offsets[-1] != len(data):
+        return None
+
+    return font_table(offsets, data)
+
+"""
+Compile a font from fonts.py
+
+glyphs - Dictionary of character: list of bytes
+"""
+def compile_font(glyphs):
+    offsets = array('H')
+    data = bytearray()
+    for ch in range(FONT_CODES):
+        offsets.append(len(data))
+        data.extend(glyphs.get(ch, []))
+    offsets.append(len(data))
+
+    return font_table(offsets, bytes(data))
+
+# Get the path of the compiled font
+def font_path(name):
+    return os.path.join(FONT_CACHE, 'font.{n}.bin'.format(n=name))
+
+"""
+Read a compiled font from the cache
+
+name - Name of the font in fonts.py
+
+Returns the table, or None if it is not in the cache or is older than fonts.py
+"""
+def read_font(name):
+    path = font_path(name)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(FONT_SOURCE):
+            return None
+
+        with open(path, 'rb') as f:
+            return from_bytes(f.read())
+    except OSError:
+        return None
+
+"""
+Save a compiled font in the cache
+
+It is written to another file first, so a process that reads the
+cache at the same time never sees half a font. If the cache can not
+be written, the font is just not cached.
+"""
+def write_font(name, font):
+    path = font_path(name)
+    temp = '{p}.{i}'.format(p=path, i=os.getpid())
+    try:
+        os.makedirs(FONT_CACHE, exist_ok=True)
+        with open(temp, 'wb') as f:
+            f.write(font.to_bytes())
+        os.replace(temp, path)
+    except OSError:
+        pass
+
+"""
+Get a font, by its name in fonts.py
+
+The font is read from the cache, if it is there. Otherwise, fonts.py is
+imported and the font is compiled and saved in the cache. A font is only
+loaded once.
+
+name - Name of the font, like 'graphic_font_6x7'
+"""
+def load_font(name):
+    font = loaded_fonts.get(name)
+    if font is None:
+        font = read_font(name)
+        if font is None:
+            from printers import fonts
+            font = compile_font(getattr(fonts, name))
+            write_font(name, font)
+
+        loaded_fonts[name] = font
+
+    return font
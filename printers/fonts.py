@@ -388,44 +388,6 @@ business_font_6x7 = {
     255 : [115, 115, 12, 12, 115, 115]
 }
 
-# Translation from control code to display code
-control_character = {
-    147 : 0xD3, # CLR           0x93
-     19 : 0x53, # HOME          0x13
-    145 : 0xD1, # UP            0x90
-     17 : 0x51, # DOWN          0x11
-    157 : 0xDD, # LEFT          0x9D
-     29 : 0x5D, # RIGHT         0x1D
-     18 : 0x52, # RVS           0x12
-    146 : 0xD2, # RVS OFF       0x92
-    144 : 0xD0, # BLK           0x90
-      5 : 0x45, # WHT           0x05
-     28 : 0x5C, # RED           0x1C
-    159 : 0xDF, # CYN           0x9F
-    156 : 0xDC, # PUR           0x9B
-     30 : 0x5E, # GRN           0x1E
-     31 : 0x5F, # BLU           0x1F
-    158 : 0xDE, # YEL           0x9E
-    129 : 0xC1, # ORG     C 1   0x81
-    149 : 0xD5, # BRN     C 2   0x95
-    150 : 0xD6, # PNK     C 3   0x96
-    151 : 0xD7, # DRK GRY C 4   0x97
-    152 : 0xD8, # MED GRY C 5   0x98
-    153 : 0xD9, # LIG GRN C 6   0x99
-    154 : 0xDA, # LIG BLU C 7   0x9A
-    155 : 0xDB, # LIG GRY C 8   0x9B
-    133 : 0xC5, # F1            0x85
-    137 : 0xC9, # F2 (SHIFT F1) 0x89
-    134 : 0xC6, # F3            0x86
-    138 : 0xCA, # F4 (SHIFT F3) 0x8A
-    135 : 0xC7, # F5            0x87
-    139 : 0xCB, # F6 (SHIFT F5) 0x8B
-    136 : 0xC8, # F7            0x88
-    140 : 0xCC, # F8 (SHIFT F7) 0x8C
-     20 : 0x54, # DEL           0x14
-    148 : 0xD4  # INS           0x94
-}
-
 vic_1520_control_character = {
     147 : 0xD3, # CLR           0x93
      19 : 0x53, # HOME          0x13
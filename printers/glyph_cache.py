@@ -0,0 +1,63 @@
+import numpy as np
+
+from printers.font_table import control_character
+
+# The dots in a column byte, bit 0 is the top dot
+COLUMN_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder='little').astype(np.uint8)
+
+"""
+Cache of the dots of the characters, ready to be copied onto the page
+
+A tile is an array of dots, font_height rows high, with a column for every
+dot column of the character. Double width characters have every column
+twice.
+"""
+class glyph_cache:
+    def __init__(self, font_height):
+        self.font_height = font_height
+        self.tiles = {}
+
+    """
+    Get the tile of a character
+
+    font - Font the character is in
+    ch - Character
+    reverse - Print the character in reverse
+    width - Width of a column (NORMAL_WIDTH or DOUBLE_WIDTH)
+    control - Character is a control code, printed in quote mode
+    """
+    def get(self, font, ch, reverse, width, control = False):
+        key = (id(font), ch, reverse, width, control)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self.make_tile(font, ch, reverse, width, control)
+            self.tiles[key] = tile
+        return tile
+
+    # Make the tile of a character
+    def make_tile(self, font, ch, reverse, width, control):
+        # Control codes are printed as the reverse
+        # of the character they are shown as
+        if control:
+            f = font[control_character[ch]]
+            reverse = True
+        else:
+            f = font[ch]
+
+        columns = np.frombuffer(f, dtype=np.uint8)
+        if reverse: columns = columns ^ 255
+
+        return column_tile(columns, self.font_height, width)
+
+"""
+Make a tile from column bytes
+
+columns - Column byte, or array of column bytes
+font_height - Number of dots in a column
+width - Width of a column
+"""
+def column_tile(columns, font_height, width):
+    tile = COLUMN_BITS[np.atleast_1d(columns), :font_height].T
+    if width != 1:
+        tile = np.repeat(tile, width, axis=1)
+    return np.ascontiguousarray(tile)
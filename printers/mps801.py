@@ -1,18 +1,17 @@
 from printers.printer_constants import *
 from printers.printer_profile import print_profile
-from printers.fonts import graphic_font_6x7
-from printers.fonts import business_font_6x7
-from printers.fonts import control_character
+from printers.font_table import load_font
+from printers.font_table import control_character
+from printers.glyph_cache import glyph_cache
 
 class mps801(print_profile):
     def __init__(self):
         super().__init__()
-        self.font_graphic = graphic_font_6x7
-        self.font_business = business_font_6x7
+        self.font_graphic = load_font('graphic_font_6x7')
+        self.font_business = load_font('business_font_6x7')
         self.font_width    = 6
         self.font_height   = 7
-        self.page_width    = 480  # Width of page
-        self.page_height   = 693  # Length of page
+        self.page_width, self.page_height = PAGE_SIZES['MPS 801'] # Width and length of page
         self.y_top         = 0
 
         self.pos         = False
@@ -27,178 +26,277 @@ class mps801(print_profile):
         self.line_space  = LPI6
         self.graph_mode  = False
 
+        # In graphics mode, bytes with the top bit set are a column of dots
+        self.graphics_bytes = bytes(range(128, 256))
+        self.graphics_offset = 128
+
         #self.font_set = self.font_graphic
 
         self.font_set = self.font_graphic
 
-    def output_character(self, f):
+        # Dots of the characters that have been printed
+        self.glyphs = glyph_cache(self.font_height)
+
+    # Characters can be printed in a run, unless we are in the middle of a command,
+    # or bytes with the top bit set are graphics
+    def plain_mode(self):
+        return not (self.esc or self.esc_esc or self.pos or self.sub or self.graph_mode)
+
+    # Graphics bytes can be printed in a run, unless we are in the middle of a command
+    def graphics_mode(self):
+        return self.graph_mode and not (self.esc or self.esc_esc or self.pos or self.sub)
+
+    def output_character(self, ch):
         # Print the character
-        for i in range(self.font_width):
-            byte = f[i]
-            if self.reverse: byte = byte ^ 255
-            offset = 0
-            self.output_byte(byte)
+        tile = self.glyphs.get(self.font_set, ch, self.reverse, self.char_width)
+        self.parent.output_glyph(tile)
 
-            # Move the the next character position
-            self.x += SIZE * self.char_width
+        # Move past the character
+        self.x += SIZE * self.char_width * self.font_width
 
     def output_control(self, ch):
         if self.quote and ch in control_character:
-            # Print the character
-            for i in range(self.font_width):
-                o = control_character[ch]
-                f = self.font_set[o]
+            # Print the character the control code is shown as
+            tile = self.glyphs.get(self.font_set, ch, False, self.char_width, control=True)
+            self.parent.output_glyph(tile)
+
+            # Move past the character
+            self.x += SIZE * self.char_width * self.font_width
+
+    """
+    Output the repeat count of a graphics byte, with as many
+    columns as fit on the line at a time
+
+    byte - Column byte
+    add_data - Add data to buffer
+    """
+    def repeat_graphics(self, byte, add_data):
+        step = SIZE * self.char_width
+        while self.repeat > 0:
+            # Check if we wrapped
+            if self.x >= self.page_width * SIZE:
+                self.x = 0
+                self.y += (self.line_space * SIZE)
+
+            # Check if we are at the end of the page. The rest
+            # of the repeat goes on a new page
+            if self.y >= self.page_height * SIZE:
+                if not add_data:
+                    self.repeat = 0
+                    break
+                self.repeat_new_page()
+
+            # Get the number of columns left on the line
+            count = min(self.repeat, -(-(self.page_width * SIZE - self.x) // step))
+
+            # Output the bitmap
+            self.parent.repeat_column(byte, count)
+            self.x += step * count
+
+            # Decrement the repeat
+            self.repeat -= count
+
+    """
+    Get the table of functions that handle each character, for the mode
+    the printer is in (See print_profile.dispatch_table)
+
+    In graphics mode, bytes with the top bit set are graphics, in
+    every mode but repeat.
+    """
+    def dispatch_table(self):
+        if self.sub:
+            return self.get_table('sub', lambda: self.mode_table(self.repeat_character))
+
+        if self.pos:
+            table = self.get_table('pos', lambda: self.mode_table(self.position_character))
+        elif self.esc:
+            table = self.get_table('esc', lambda: self.mode_table(self.end_escape, {
+                ESC: self.escape_escape,
+                0: self.secondary_address_character,
+                7: self.secondary_address_character
+            }))
+        else:
+            table = self.normal_table()
+
+        if self.graph_mode:
+            table = self.get_table(('graphics', id(table)), lambda: self.change_table(
+                table, {ch: self.graphics_character for ch in range(128, 256)}
+            ))
+
+        return table
+
+    def control_actions(self):
+        return {
+            BS: self.graphics_on,
+            SO: self.double_width,
+            SI: self.standard_width,
+            POS: self.start_position,
+            SUB: self.start_repeat,
+            RVS_ON: self.reverse_on,
+            RVS_OFF: self.reverse_off,
+            FF: self.form_feed,
+            CURSOR_UP: self.graphic_font,
+            CURSOR_DOWN: self.business_font,
+            NL: self.new_line,
+            CR: self.new_line
+        }
+
+    # Repeat graphic select command, the repeat count and the byte to repeat
+    def repeat_character(self, ch, add_data):
+        # If we have not read the repeat yet
+        if self.repeat == -1:
+
+            # Set repeat
+            self.repeat = ch
+
+            # If repeat is 0, set it to 256
+            if self.repeat == 0: self.repeat = 256
+        else:
+            # if repeat is set, turn off sub
+            self.sub = False
+            self.mode_changed()
+
+            # Output repeated graphics a line at a time
+            if self.graph_mode and ch & 128 == 128:
+                self.repeat_graphics(ch - 128, add_data)
+
+            # Count down the repeats
+            while self.repeat > 0:
+                # Check if we wrapped
+                if self.x >= self.page_width * SIZE:
+                    self.x = 0
+                    self.y += (self.line_space * SIZE)
+
+                # Check if we are at the end of the page. The rest
+                # of the repeat goes on a new page
+                if self.y >= self.page_height * SIZE:
+                    if not add_data: break
+                    self.repeat_new_page()
+
+                # Output the bitmap
+                self.chout(ch, False)
+
+                # Decrement the repeat
+                self.repeat -= 1
+
+            # Reset the repeat count
+            self.repeat = -1
+
+    """
+    Start a new page in the middle of a repeat
+
+    The new page starts with the rest of the repeat, so the state of the
+    printer is saved as still repeating, and the repeated byte is moved
+    to the page data of the new page. When the page before is redrawn,
+    the repeat stops at the end of the page.
+    """
+    def repeat_new_page(self):
+        self.sub = True
+        self.parent.new_page(True)
+        self.sub = False
+
+    # If we are in graphics mode, output the bitmapped byte
+    def graphics_character(self, ch, add_data):
+        self.parent.output_byte(ch - 128)
+        self.x += SIZE * self.char_width 
+
+    # Positional mode, the two bytes of the position
+    def position_character(self, ch, add_data):
+        # If the first position is not set, set it
+        if self.pos1 == -1:
+            self.pos1 = ch
+        else:
+            # If the second position is not set, set it
+            if self.pos2 == -1:
+                self.pos2 = ch
+
+                #if we are in escape mode, position by dot
+                if self.esc_esc == True:
+                    p = self.pos2 + ((self.pos1 & 1) * 512)
+                    if p < 479:
+                        self.x = SIZE * p
+                # otherwise position by character
+                else:
+                    if chr(self.pos1) >= '0' and chr(self.pos1) <= '9' and chr(self.pos2) >= '0' and chr(self.pos2) <= '9':
+                        pos_str = chr(self.pos1) + chr(self.pos2)
+                        if int(pos_str) < 80:
+                            self.x = SIZE * 6 * int(pos_str)
+                # Reset the position value
+                self.pos = False
+                self.pos1 = -1
+                self.pos2 = -1
+                self.esc = False
+                self.esc_esc = False
+                self.mode_changed()
+
+    # If we are in escape mode and the character is one of 
+    # the secondary addresses, set the font set
+    def secondary_address_character(self, ch, add_data):
+        self.esc = False
+        self.mode_changed()
+        if self.secondary_address != ch:
+            self.secondary_address = ch
+            if self.secondary_address == self.SEC_ADDR_GRAPHIC:
+                self.font_set = self.font_graphic
+            else:
+                self.font_set = self.font_business
+        else:
+            self.process_character(ch, add_data)
 
-                byte = f[i]
-                byte = byte ^ 255
-                offset = 0
-                self.output_byte(byte)
+    def graphics_on(self, ch, add_data):         # Graphics on
+        self.graph_mode = True
+        self.line_space  = LPI9 # Change the line spacing to closer together
 
-                # Move the the next character position
-                self.x += SIZE * self.char_width
+    def double_width(self, ch, add_data):        # Double width character mode
+        self.char_width = DOUBLE_WIDTH
+        self.graph_mode = False
+        self.line_space  = LPI6
 
-    def pre_chout(self, ch, add_data):
-        if self.sub:
-            # If we have not read the repeat yet
-            if self.repeat == -1:
+    def standard_width(self, ch, add_data):      # Standard character mode
+        self.char_width = NORMAL_WIDTH
+        self.graph_mode = False
+        self.line_space  = LPI6
+        # TODO: Re-align the output to be an a character boundary
 
-                # Set repeat
-                self.repeat = ch
+    def start_position(self, ch, add_data):      # Print start position addressing
+        self.pos = True
 
-                # If repeat is 0, set it to 256
-                if self.repeat == 0: self.repeat = 256
-            else:
-                # if repeat is set, turn off sub
-                self.sub = False
-
-                # Count down the repeats
-                while self.repeat > 0:
-                    # Check if we wrapped
-                    if self.x >= self.page_width * SIZE:
-                        self.x = 0
-                        self.y += (self.line_space * SIZE)
-
-                    # If we are adding to the buffer
-                    if add_data:
-                        # Check if we are at the end of the page,
-                        # and start a new page if we are
-                        # TODO: Make sub be able to extend to 
-                        # the next page
-                        if self.y >= self.page_height * SIZE:
-                            self.parent.new_page()
-
-                    # Output the bitmap
-                    self.chout(ch, False)
-
-                    # Decrement the repeat
-                    self.repeat -= 1
-
-                # Reset the repeat count
-                self.repeat = -1
-            return True
-
-        # If we are in graphics mode, output the bitmapped byte
-        if self.graph_mode and ch & 128 == 128:
-            self.parent.output_byte(ch - 128)
-            self.x += SIZE * self.char_width 
-            return True
-
-        # If we are in positional mode
-        if self.pos == True:
-            # If the first position is not set, set it
-            if self.pos1 == -1:
-                self.pos1 = ch
-            else:
-                # If the second position is not set, set it
-                if self.pos2 == -1:
-                    self.pos2 = ch
-
-                    #if we are in escape mode, position by dot
-                    if self.esc_esc == True:
-                        p = self.pos2 + ((self.pos1 & 1) * 512)
-                        if p < 479:
-                            self.x = SIZE * p
-                    # otherwise position by character
-                    else:
-                        if chr(self.pos1) >= '0' and chr(self.pos1) <= '9' and chr(self.pos2) >= '0' and chr(self.pos2) <= '9':
-                            pos_str = chr(self.pos1) + chr(self.pos2)
-                            if int(pos_str) < 80:
-                                self.x = SIZE * 6 * int(pos_str)
-                    # Reset the position value
-                    self.pos = False
-                    self.pos1 = -1
-                    self.pos2 = -1
-                    self.esc = False
-                    self.esc_esc = False
-            return True
-
-        # If we are in escape mode and the character is one of 
-        # the secondary addresses, set the font set
-        if self.esc == True:
-            self.esc = False
-            if ch == 0 or ch == 7:
-                if self.secondary_address != ch:
-                    self.secondary_address = ch
-                    if self.secondary_address == self.SEC_ADDR_GRAPHIC:
-                        self.font_set = self.font_graphic
-                    else:
-                        self.font_set = self.font_business
-                    return True
-        return False
-
-    def post_chout(self, ch, add_data):
-        if ch == BS:          # Graphics on
-            self.graph_mode = True
-            self.line_space  = LPI9 # Change the line spacing to closer together
-
-        if ch == SO:          # Double width character mode
-            self.char_width = DOUBLE_WIDTH
-            self.graph_mode = False
-            self.line_space  = LPI6
-
-        if ch == SI:          # Standard character mode
-            self.char_width = NORMAL_WIDTH
-            self.graph_mode = False
-            self.line_space  = LPI6
-            # TODO: Re-align the output to be an a character boundary
-
-        if ch == POS:         # Print start position addressing
-            self.pos = True
-
-        if ch == SUB:         # Repeat graphic select command
-            self.sub = True
-
-        if ch == RVS_ON:      # Reverse on
-            self.reverse = True
-
-        if ch == RVS_OFF:     # Revers off
-            self.reverse = False
-
-        if ch == FF:          # Form feed
-            self.parent.new_page()
-
-        if ch == CURSOR_UP and not self.quote:   # Cursor up mode (Graphic)
+    def start_repeat(self, ch, add_data):        # Repeat graphic select command
+        self.sub = True
+
+    def reverse_on(self, ch, add_data):          # Reverse on
+        self.reverse = True
+
+    def reverse_off(self, ch, add_data):         # Revers off
+        self.reverse = False
+
+    def form_feed(self, ch, add_data):           # Form feed
+        self.parent.new_page()
+
+    def graphic_font(self, ch, add_data):        # Cursor up mode (Graphic)
+        if not self.quote:
             self.font_set = self.font_graphic
 
-        if ch == CURSOR_DOWN and not self.quote: # Cursor down mode (Business)
+    def business_font(self, ch, add_data):       # Cursor down mode (Business)
+        if not self.quote:
             self.font_set = self.font_business
 
-        # Process new line and carriage return
-        if ch == NL or ch == CR:
-            # Move to beginning of next line
-            self.x = 0
-            self.y += (self.line_space * SIZE)
-
-            # Reset all the flags
-            #if self.secondary_address == self.SEC_ADDR_GRAPHIC:
-            #    self.font_set = self.font_graphic
-            #else:
-            #    self.font_set = self.font_business
-            self.reverse = False
-            # self.graph_mode = False # I don't think graphic mode gets turned of
-            self.pos = False
-            self.esc = False
-            self.quote = False
+    # Process new line and carriage return
+    def new_line(self, ch, add_data):
+        # Move to beginning of next line
+        self.x = 0
+        self.y += (self.line_space * SIZE)
+
+        # Reset all the flags
+        #if self.secondary_address == self.SEC_ADDR_GRAPHIC:
+        #    self.font_set = self.font_graphic
+        #else:
+        #    self.font_set = self.font_business
+        self.reverse = False
+        # self.graph_mode = False # I don't think graphic mode gets turned of
+        self.pos = False
+        self.esc = False
+        self.quote = False
 
     def clear_output(self):
         super().clear_output()
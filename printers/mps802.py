@@ -1,8 +1,8 @@
 from printers.printer_constants import *
 from printers.printer_profile import print_profile
-from printers.fonts import graphic_font_8x8
-from printers.fonts import business_font_8x8
-from printers.fonts import control_character
+from printers.font_table import load_font
+from printers.font_table import control_character
+from printers.glyph_cache import glyph_cache
 
 class mps802(print_profile):
     def __init__(self):
@@ -13,12 +13,11 @@ class mps802(print_profile):
         self.LPI4 = 36
         self.LPI1 = 72
         self.y_top         = 0
-        self.font_graphic = graphic_font_8x8
-        self.font_business = business_font_8x8
+        self.font_graphic = load_font('graphic_font_8x8')
+        self.font_business = load_font('business_font_8x8')
         self.font_width    = 8
         self.font_height   = 8
-        self.page_width    = 640 # Width of page
-        self.page_height   = 720 # 693  # Length of page
+        self.page_width, self.page_height = PAGE_SIZES['MPS 802'] # Width and length of page
         self.line_space_val = self.LPI6 # LPI6
         self.inches_per_page = self.page_height / 11; # 11 Inches
         self.line_space    = self.inches_per_page / ((72 / self.line_space_val ) * 2)
@@ -26,6 +25,9 @@ class mps802(print_profile):
         self.graph_mode    = False
         self.def_char      = False
 
+        # In graphics mode, every byte but ESC is a column of dots
+        self.graphics_bytes = bytes(ch for ch in range(256) if ch != ESC)
+
         self.font_set = self.font_graphic
 
         self.set_format = False
@@ -35,6 +37,12 @@ class mps802(print_profile):
 
         self.custom_character = [0,0,0,0,0,0,0,0]
 
+        # The programmable character is not in the font
+        self.run_exclude = bytes([QUOTE, 254])
+
+        # Dots of the characters that have been printed
+        self.glyphs = glyph_cache(self.font_height)
+
     def set_line_spacing(self, value):
         self.line_space_val = value
         self.line_space    = self.inches_per_page / ((72 / self.line_space_val ) * 2)
@@ -55,191 +63,247 @@ class mps802(print_profile):
 
         pass
 
-    def output_character(self, f):
+    # Characters can be printed in a run, unless they are part of a command
+    def plain_mode(self):
+        return not (self.esc or self.esc_esc or self.set_format or self.set_formatting
+            or self.graph_mode or self.def_char or self.space_between_lines)
+
+    # Graphics bytes can be printed in a run, unless we are in the middle of a command
+    def graphics_mode(self):
+        return self.graph_mode and not (self.esc or self.esc_esc or self.set_format or self.set_formatting)
+
+    def output_character(self, ch):
         # Print the character
-        for i in range(self.font_width):
-            byte = f[i]
-            if self.reverse: byte = byte ^ 255
-            offset = 0
-            self.output_byte(byte)
+        tile = self.glyphs.get(self.font_set, ch, self.reverse, self.char_width)
+        self.parent.output_glyph(tile)
 
-            # Move the the next character position
-            self.x += SIZE * self.char_width
+        # Move past the character
+        self.x += SIZE * self.char_width * self.font_width
 
     def output_control(self, ch):
         if self.quote and ch in control_character:
-            # Print the character
-            for i in range(self.font_width):
-                o = control_character[ch]
-                f = self.font_set[o]
-
-                byte = f[i]
-                byte = byte ^ 255
-                offset = 0
-                self.output_byte(byte)
-
-                # Move the the next character position
-                self.x += SIZE * self.char_width
-
-
-    def pre_chout(self, ch, add_data):
-        # If we are in escape mode and the character is one of 
-        # the secondary addresses, set the font set
-
-        if ch == ESC:         # When followed by the POS code, start position of dot address
-            self.esc = True
-            return True
-
-        if self.esc == True:
-            self.esc = False
-            if ch == 0 or ch == 7:
-                if self.secondary_address != ch:
-                    self.secondary_address = ch
-                    if self.secondary_address == self.SEC_ADDR_GRAPHIC:
-                        self.font_set = self.font_graphic
-                    else:
-                        self.font_set = self.font_business
-                    return True
-
-            if ch == 0x3f: # End of secondary address
-                if self.space_between_lines == True:
-                    self.space_between_lines = False
-
-                if self.set_format == True:
-                    print(self.format)
-                    self.set_format = False
-
-                if self.set_formatting == True:
-                    print(self.formatting)
-                    self.set_formatting = False
-                    self.process_formatting()
-
-                if self.graph_mode == True:
-                    self.graph_mode = False
-
-                if self.def_char == True:
-                    self.def_char = False
-                    while len(self.custom_character) < 8: self.custom_character.append(0)
-                return True
-
-            if ch == 1: # Invoke formatting feature
-                self.set_formatting = True
-                self.formatting = ""
-                return True
-
-            if ch == 2: # Store format data
-                self.set_format = True
-                self.format = ""
-                return True
-
-            if ch == 3: # Number of lines per page
-                return True
-
-            if ch == 4: # Enable diagnostic messages
-                return True
-
-            if ch == 5: # Define programmable character
-                self.def_char = True
-                self.custom_character = []
-                return True
-
-            if ch == 6: # Set spacing between lines
-                self.space_between_lines = True
-                return True
-
-            if ch == 8: # Graphic mode toggle
-                self.graph_mode = True
-                return True
-
-            if ch == 9: # Suppress diagnostic messages
-                return True
-
-            if ch == 10: # Reset printer
-                return True
+            # Print the character the control code is shown as
+            tile = self.glyphs.get(self.font_set, ch, False, self.char_width, control=True)
+            self.parent.output_glyph(tile)
+
+            # Move past the character
+            self.x += SIZE * self.char_width * self.font_width
+
+    """
+    Get the table of functions that handle each character, for the mode
+    the printer is in (See print_profile.dispatch_table)
+
+    An escape starts an escape sequence in every mode.
+    """
+    def dispatch_table(self):
+        if self.esc:
+            return self.get_table('esc', lambda: self.mode_table(self.end_escape, {
+                ESC: self.escape_escape,
+                0: self.secondary_address_character,
+                7: self.secondary_address_character,
+                0x3f: self.end_secondary_address,   # End of secondary address
+                1: self.start_formatting,           # Invoke formatting feature
+                2: self.start_format,               # Store format data
+                3: self.ignore_command,                   # Number of lines per page
+                4: self.ignore_command,                   # Enable diagnostic messages
+                5: self.start_custom_character,     # Define programmable character
+                6: self.start_line_spacing,         # Set spacing between lines
+                8: self.start_graphics,             # Graphic mode toggle
+                9: self.ignore_command,                   # Suppress diagnostic messages
+                10: self.ignore                     # Reset printer
+            }))
+
+        escape = {ESC: self.start_escape}
 
         if self.esc_esc:
-            ch = ESC
-            self.esc_esc = False
+            return self.get_table('esc_esc', lambda: self.mode_table(self.escaped_character, escape))
 
-        if self.set_format == True and ch != ESC:
-            self.format += chr(ch)
-            return True
+        if self.set_format:
+            return self.get_table('format', lambda: self.mode_table(self.format_character, escape))
 
-        if self.set_formatting == True and ch != ESC:
-            self.formatting +=chr(ch)
-            return True
+        if self.set_formatting:
+            return self.get_table('formatting', lambda: self.mode_table(self.formatting_character, escape))
 
-        if self.graph_mode and ch != ESC:
-            self.parent.output_byte(ch)
-            self.parent.x += SIZE * self.char_width
-            return True
+        if self.graph_mode:
+            return self.get_table('graphics', lambda: self.mode_table(self.graphics_character, escape))
 
         if self.def_char:
-            if len(self.custom_character) < 8:
-                self.custom_character.append(ch)
-            return True
-        
+            return self.get_table('custom', lambda: self.mode_table(self.custom_character_byte, escape))
+
+        if self.space_between_lines:
+            return self.get_table('spacing', lambda: self.mode_table(self.line_spacing_character, escape))
+
+        # The programmable character is printed instead of the one in the font
+        table = self.normal_table()
+        return self.get_table(('text', id(table)), lambda: self.change_table(table, {
+            ESC: self.start_escape,
+            254: self.print_custom_character
+        }))
+
+    def control_actions(self):
+        return {
+            CURSOR_UP: self.graphic_font,
+            CURSOR_DOWN: self.business_font,
+            RVS_ON: self.reverse_on,
+            RVS_OFF: self.reverse_off,
+            FF: self.form_feed,
+            SO: self.double_width,
+            SI: self.standard_width,
+            NL: self.new_line,
+            CR: self.new_line
+        }
+
+    # If we are in escape mode and the character is one of 
+    # the secondary addresses, set the font set
+    def secondary_address_character(self, ch, add_data):
+        self.esc = False
+        self.mode_changed()
+        if self.secondary_address != ch:
+            self.secondary_address = ch
+            if self.secondary_address == self.SEC_ADDR_GRAPHIC:
+                self.font_set = self.font_graphic
+            else:
+                self.font_set = self.font_business
+        else:
+            self.process_character(ch, add_data)
+
+    # End of secondary address
+    def end_secondary_address(self, ch, add_data):
+        self.esc = False
+        self.mode_changed()
+
         if self.space_between_lines == True:
-            self.set_line_spacing(ch)
-            return True
+            self.space_between_lines = False
 
-        if ch == 254:
-            for i in self.custom_character:
-                self.parent.output_byte(i)
-                self.parent.x += SIZE * self.char_width
-            return True
+        if self.set_format == True:
+            print(self.format)
+            self.set_format = False
 
-        return False
+        if self.set_formatting == True:
+            print(self.formatting)
+            self.set_formatting = False
+            self.process_formatting()
 
-    def post_chout(self, ch, add_data):
-        if ch == CURSOR_UP and not self.quote:   # Cursor up mode (Graphic)
-            self.font_set = self.font_graphic
+        if self.graph_mode == True:
+            self.graph_mode = False
 
-        if ch == CURSOR_DOWN and not self.quote: # Cursor down mode (Business)
-            self.font_set = self.font_business
+        if self.def_char == True:
+            self.def_char = False
+            while len(self.custom_character) < 8: self.custom_character.append(0)
 
-        if ch == RVS_ON:      # Reverse on
-            self.reverse = True
+    def start_formatting(self, ch, add_data):     # Invoke formatting feature
+        self.esc = False
+        self.mode_changed()
+        self.set_formatting = True
+        self.formatting = ""
 
-        if ch == RVS_OFF:     # Revers off
-            self.reverse = False
+    def start_format(self, ch, add_data):         # Store format data
+        self.esc = False
+        self.mode_changed()
+        self.set_format = True
+        self.format = ""
+
+    def start_custom_character(self, ch, add_data): # Define programmable character
+        self.esc = False
+        self.mode_changed()
+        self.def_char = True
+        self.custom_character = []
+
+    def start_line_spacing(self, ch, add_data):   # Set spacing between lines
+        self.esc = False
+        self.mode_changed()
+        self.space_between_lines = True
+
+    def start_graphics(self, ch, add_data):       # Graphic mode toggle
+        self.esc = False
+        self.mode_changed()
+        self.graph_mode = True
+
+    # Escape commands that do nothing
+    def ignore_command(self, ch, add_data):
+        self.esc = False
+        self.mode_changed()
+
+    # The character after an escape escape is taken as an escape,
+    # by the modes that need a byte, and printed otherwise
+    def escaped_character(self, ch, add_data):
+        if self.def_char:
+            self.custom_character_byte(ESC, add_data)
+        elif self.space_between_lines:
+            self.line_spacing_character(ESC, add_data)
+        else:
+            self.normal_table()[ch](ch, add_data)
 
-        if ch == FF:          # Form feed
-            self.parent.new_page()
+        # The escape is only over after the character is printed, so if it
+        # starts a new page, the page is saved in this mode (See new_page)
+        self.esc_esc = False
+        self.mode_changed()
 
-        if ch == SO:          # Double width character mode
-            self.char_width = DOUBLE_WIDTH
-            self.graph_mode = False
-            self.set_line_spacing(self.LPI6)
+    def format_character(self, ch, add_data):
+        self.format += chr(ch)
 
-        if ch == SI:          # Standard character mode
-            self.char_width = NORMAL_WIDTH
-            self.graph_mode = False
-            self.set_line_spacing(self.LPI6)
-            # TODO: Re-align the output to be an a character boundary
+    def formatting_character(self, ch, add_data):
+        self.formatting +=chr(ch)
+
+    def graphics_character(self, ch, add_data):
+        self.parent.output_byte(ch)
+        self.x += SIZE * self.char_width
+
+    def custom_character_byte(self, ch, add_data):
+        if len(self.custom_character) < 8:
+            self.custom_character.append(ch)
+
+    def line_spacing_character(self, ch, add_data):
+        self.set_line_spacing(ch)
+
+    def print_custom_character(self, ch, add_data):
+        self.parent.output_columns(self.custom_character)
+        self.x += SIZE * self.char_width * len(self.custom_character)
 
-        if ch == CURSOR_UP and not self.quote:   # Cursor up mode (Graphic)
+    def graphic_font(self, ch, add_data):        # Cursor up mode (Graphic)
+        if not self.quote:
             self.font_set = self.font_graphic
 
-        if ch == CURSOR_DOWN and not self.quote: # Cursor down mode (Business)
+    def business_font(self, ch, add_data):       # Cursor down mode (Business)
+        if not self.quote:
             self.font_set = self.font_business
 
-        # Process new line and carriage return
-        if ch == NL or ch == CR:
-            # Move to beginning of next line
-            self.x = 0
-            self.y += (self.line_space * SIZE)
-
-            # Reset all the flags
-            #if self.secondary_address == self.SEC_ADDR_GRAPHIC:
-            #    self.font_set = self.font_graphic
-            #else:
-            #    self.font_set = self.font_business
-            self.reverse = False
-            # self.graph_mode = False # I don't think graphic mode gets turned of
-            self.pos = False
-            self.esc = False
-            self.quote = False
+    def reverse_on(self, ch, add_data):          # Reverse on
+        self.reverse = True
+
+    def reverse_off(self, ch, add_data):         # Revers off
+        self.reverse = False
+
+    def form_feed(self, ch, add_data):           # Form feed
+        self.parent.new_page()
+
+    def double_width(self, ch, add_data):        # Double width character mode
+        self.char_width = DOUBLE_WIDTH
+        self.graph_mode = False
+        self.set_line_spacing(self.LPI6)
+
+    def standard_width(self, ch, add_data):      # Standard character mode
+        self.char_width = NORMAL_WIDTH
+        self.graph_mode = False
+        self.set_line_spacing(self.LPI6)
+        # TODO: Re-align the output to be an a character boundary
+
+    # Process new line and carriage return
+    def new_line(self, ch, add_data):
+        # Move to beginning of next line
+        self.x = 0
+        self.y += (self.line_space * SIZE)
+
+        # Reset all the flags
+        #if self.secondary_address == self.SEC_ADDR_GRAPHIC:
+        #    self.font_set = self.font_graphic
+        #else:
+        #    self.font_set = self.font_business
+        self.reverse = False
+        # self.graph_mode = False # I don't think graphic mode gets turned of
+        self.pos = False
+        self.esc = False
+        self.quote = False
 
     def clear_output(self):
         super().clear_output()
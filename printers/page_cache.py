@@ -0,0 +1,115 @@
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Rough size of a segment in a display list, in bytes
+SEGMENT_SIZE = 100
+
+"""
+Cache of rendered pages, so they do not need to be redrawn from the page data
+
+A page is the dots of the page, and the display list of the plotter lines.
+The pages that were used last are kept as they are. Older pages have their
+dots packed to bits and compressed with zlib. When the cache is bigger than
+its budget, the pages that were not used for the longest time are dropped,
+and have to be redrawn the next time they are needed.
+
+Only pages that are finished should be put in the cache, since the cache
+does not know when a page changes.
+"""
+class page_cache:
+    """
+    budget - Memory the pages can use, in bytes
+    raw_pages - Number of recent pages that are not compressed
+    """
+    def __init__(self, budget, raw_pages):
+        self.budget = budget
+        self.raw_pages = raw_pages
+
+        # Page number -> [dots or compressed dots, shape, display list, size]
+        # in the order they were used, the last one is the most recent
+        self.pages = OrderedDict()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.pages)
+
+    # Remove all the pages
+    def clear(self):
+        self.pages.clear()
+        self.size = 0
+
+    """
+    Add a page to the cache
+
+    page - Page number
+    dots - Dots of the page, this is copied
+    lines - Display list of the page
+    """
+    def put(self, page, dots, lines):
+        self.remove(page)
+
+        entry = [dots.copy(), dots.shape, lines, 0]
+        self.pages[page] = entry
+        self.set_size(entry)
+
+        self.trim()
+
+    """
+    Get a page from the cache
+
+    page - Page number
+
+    Returns (dots, display list), or None if the page is not in the cache.
+    The dots should not be changed, copy them to the page.
+    """
+    def get(self, page):
+        entry = self.pages.get(page)
+        if entry is None:
+            return None
+
+        # This is now the most recent page
+        self.pages.move_to_end(page)
+
+        # Uncompress the dots, since it is likely to be used again
+        if not isinstance(entry[0], np.ndarray):
+            shape = entry[1]
+            bits = np.frombuffer(zlib.decompress(entry[0]), dtype=np.uint8)
+            entry[0] = np.unpackbits(bits, count=shape[0] * shape[1]).reshape(shape)
+            self.set_size(entry)
+            self.trim()
+
+        return (entry[0], entry[2])
+
+    # Remove a page from the cache, if it is there
+    def remove(self, page):
+        entry = self.pages.pop(page, None)
+        if entry is not None:
+            self.size -= entry[3]
+
+    # Work out how much memory a page is using
+    def set_size(self, entry):
+        if isinstance(entry[0], np.ndarray):
+            size = entry[0].nbytes
+        else:
+            size = len(entry[0])
+        size += len(entry[2]) * SEGMENT_SIZE
+
+        self.size += size - entry[3]
+        entry[3] = size
+
+    # Compress the older pages, and drop pages until we are within the budget
+    def trim(self):
+        # Compress the pages after the most recent ones
+        pages = list(self.pages.values())
+        for entry in pages[:-self.raw_pages] if self.raw_pages > 0 else pages:
+            if isinstance(entry[0], np.ndarray):
+                entry[0] = zlib.compress(np.packbits(entry[0]).tobytes())
+                self.set_size(entry)
+
+        # Drop the pages that were not used for the longest time,
+        # but keep the most recent one
+        while self.size > self.budget and len(self.pages) > 1:
+            page, entry = self.pages.popitem(last=False)
+            self.size -= entry[3]
@@ -0,0 +1,202 @@
+import io
+import zlib
+
+from PIL import Image
+
+# TIFF tags used to get the compressed data of a black and white image
+TIFF_STRIP_OFFSETS = 273
+TIFF_ROWS_PER_STRIP = 278
+TIFF_STRIP_BYTE_COUNTS = 279
+
+"""
+Compress an image for a PDF file
+
+This is kept apart from the writer, so the images can be compressed in
+other processes. Black and white images are compressed with CCITT group 4,
+like a fax, and other images with Flate.
+
+image - Image, in 1, L or RGB mode
+
+Returns (width, height, dictionary, data) of the image stream
+"""
+def encode_image(image):
+    if image.mode == '1':
+        dictionary = '/Type /XObject /Subtype /Image /Width {w} /Height {h} /ColorSpace /DeviceGray /BitsPerComponent 1 /Filter /CCITTFaxDecode /DecodeParms << /K -1 /Columns {w} /Rows {h} /BlackIs1 true >>'.format(
+            w=image.width, h=image.height
+        )
+        return (image.width, image.height, dictionary, encode_group4(image))
+
+    if image.mode == 'RGB':
+        color_space = '/DeviceRGB'
+    else:
+        image = image.convert('L')
+        color_space = '/DeviceGray'
+
+    dictionary = '/Type /XObject /Subtype /Image /Width {w} /Height {h} /ColorSpace {c} /BitsPerComponent 8 /Filter /FlateDecode'.format(
+        w=image.width, h=image.height, c=color_space
+    )
+
+    return (image.width, image.height, dictionary, zlib.compress(image.tobytes()))
+
+"""
+Compress a black and white image with CCITT group 4
+
+The image is saved as a TIFF file in one strip, and the strip is the
+compressed data.
+
+image - Image, in 1 mode
+"""
+def encode_group4(image):
+    tiff = io.BytesIO()
+    image.save(tiff, 'TIFF', compression='group4', tiffinfo={TIFF_ROWS_PER_STRIP: image.height})
+
+    tags = Image.open(io.BytesIO(tiff.getvalue())).tag_v2
+    offset = tags[TIFF_STRIP_OFFSETS][0]
+    count = tags[TIFF_STRIP_BYTE_COUNTS][0]
+
+    return tiff.getvalue()[offset:offset + count]
+
+"""
+Simple PDF file writer
+
+Objects are written to the file as they are added, and only the offsets
+of the objects are kept, so the pages do not need to stay in memory. The
+page tree, catalog and cross reference table are written by finish().
+
+The file can be finished, so it can be read, and then rewound to a mark
+to add more pages. Everything written after the mark is removed.
+
+Object 1 is the catalog, and object 2 is the page tree.
+"""
+class pdf_writer:
+    def __init__(self, output_file):
+        self.file = open(output_file, 'w+b')
+        self.offsets = {}
+        self.pages = []
+        self.next_object = 3
+        self.finished = False
+
+        self.file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    # Get the number of a new object
+    def new_object(self):
+        number = self.next_object
+        self.next_object += 1
+        return number
+
+    """
+    Write an object
+
+    data - Object data, without obj and endobj
+    number - Object number, or None for a new object
+
+    Returns the number of the object
+    """
+    def add_object(self, data, number = None):
+        if number is None:
+            number = self.new_object()
+
+        self.finished = False
+        self.offsets[number] = self.file.tell()
+        self.file.write('{n} 0 obj\n'.format(n=number).encode('ascii'))
+        self.file.write(data)
+        self.file.write(b'\nendobj\n')
+        return number
+
+    """
+    Write a stream object
+
+    dictionary - Entries of the stream dictionary, without the Length
+    data - Stream data
+    """
+    def add_stream(self, dictionary, data):
+        header = '<< {d} /Length {n} >>\nstream\n'.format(d=dictionary, n=len(data))
+        return self.add_object(header.encode('ascii') + data + b'\nendstream')
+
+    """
+    Write a page
+
+    width, height - Size of the page in points
+    content - Content stream of the page
+    resources - Resource dictionary of the page
+    """
+    def add_page(self, width, height, content, resources = '<< >>'):
+        contents = self.add_stream('', content)
+        page = self.add_object(
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {w:.2f} {h:.2f}] /Resources {r} /Contents {c} 0 R >>'.format(
+                w=width, h=height, r=resources, c=contents
+            ).encode('ascii')
+        )
+        self.pages.append(page)
+        return page
+
+    """
+    Write a page with an image that covers all of it
+
+    image - Image, in 1, L or RGB mode
+    resolution - Pixels per inch of the image
+    """
+    def add_image_page(self, image, resolution):
+        return self.add_encoded_page(encode_image(image), resolution)
+
+    """
+    Write a page with an image that was compressed by encode_image
+
+    encoded - Compressed image
+    resolution - Pixels per inch of the image
+    """
+    def add_encoded_page(self, encoded, resolution):
+        image_width, image_height, dictionary, data = encoded
+        picture = self.add_stream(dictionary, data)
+
+        # Stretch the image over the page
+        width = image_width * 72 / resolution
+        height = image_height * 72 / resolution
+        content = 'q {w:.2f} 0 0 {h:.2f} 0 0 cm /Im0 Do Q'.format(w=width, h=height)
+        resources = '<< /XObject << /Im0 {p} 0 R >> >>'.format(p=picture)
+
+        return self.add_page(width, height, content.encode('ascii'), resources)
+
+    # Get a mark of what has been written so far (See rewind)
+    def mark(self):
+        return (self.file.tell(), self.next_object, len(self.pages))
+
+    """
+    Remove everything that was written after a mark
+
+    mark - Mark to go back to
+    """
+    def rewind(self, mark):
+        position, next_object, pages = mark
+
+        self.file.seek(position)
+        self.file.truncate()
+
+        for number in range(next_object, self.next_object):
+            self.offsets.pop(number, None)
+        self.next_object = next_object
+        del self.pages[pages:]
+        self.finished = False
+
+    # Write the page tree, catalog and cross reference table, so the file can be read
+    def finish(self):
+        kids = ' '.join('{p} 0 R'.format(p=p) for p in self.pages)
+        self.add_object('<< /Type /Pages /Kids [{k}] /Count {n} >>'.format(k=kids, n=len(self.pages)).encode('ascii'), 2)
+        self.add_object(b'<< /Type /Catalog /Pages 2 0 R >>', 1)
+
+        # Cross reference table
+        xref = self.file.tell()
+        self.file.write('xref\n0 {n}\n'.format(n=self.next_object).encode('ascii'))
+        self.file.write(b'0000000000 65535 f \n')
+        for number in range(1, self.next_object):
+            self.file.write('{o:010d} 00000 n \n'.format(o=self.offsets[number]).encode('ascii'))
+
+        self.file.write('trailer\n<< /Size {n} /Root 1 0 R >>\nstartxref\n{x}\n%%EOF\n'.format(n=self.next_object, x=xref).encode('ascii'))
+        self.file.flush()
+        self.finished = True
+
+    # Finish the file, if it is not finished, and close it
+    def close(self):
+        if not self.finished:
+            self.finish()
+        self.file.close()
@@ -27,3 +27,36 @@ OUTPUT_SIZE = 4      # Output Size Multiplier
 OUTPUT_MULIPLIER = 2 # Output Multplier from output size
 
 MIN_Y       = 500  # Minimum size of the frame
+
+# Width and length of the page of each printer, so the window
+# can be sized before the printer profile is loaded
+PAGE_SIZES = {
+    'MPS 801': (480, 693),
+    'MPS 802': (640, 720),    # 693
+    'VIC 1520': (480, 999 * 2)
+}
+
+# Colors of the plotter pens: black, blue, green and red
+# The window and every saved file draw the lines in these colors
+PEN_COLORS = ['#000000', '#0000FF', '#008000', '#FF0000']
+
+FRAME_RATE  = 30   # Maximum display updates per second
+
+PAGE_CACHE_SIZE  = 32 * 1024 * 1024 # Memory for rendered pages, in bytes
+PAGE_CACHE_RAW   = 4                # Number of recent pages kept uncompressed
+
+OUTPUT_RESOLUTION = 100 # Pixels per inch of the saved pages, with OUTPUT_SIZE pixels for each dot
+DOT_THRESHOLD     = 160 # Pixels of the dot bitmap darker than this are black
+
+# Pixels per inch of the saved pages, for each output quality
+OUTPUT_QUALITY = {
+    'Draft': 50,
+    'Normal': OUTPUT_RESOLUTION,
+    'Archival': 300
+}
+
+PARALLEL_PAGES = 8 # Fewest unsaved pages that are worth drawing in other processes
+
+SERIAL_BUFFER_SIZE = 1024 * 1024 # Bytes read from the serial port that are waiting to be printed
+SERIAL_CHUNK       = 4096        # Most bytes printed at a time, between display updates
+SERIAL_TIMEOUT     = 0.1         # Seconds the reader waits for data, before checking if it should stop
@@ -1,4 +1,10 @@
+import math
+import re
+
+import numpy as np
+
 from printers.printer_constants import *
+from printers.font_table import font_table
 
 class print_profile:
     def __init__(self):
@@ -14,6 +20,27 @@ class print_profile:
         self.char_width  = NORMAL_WIDTH
         self.line_space  = LPI6
 
+        # Set if the printer draws lines instead of dots
+        self.plotter     = False
+
+        # Characters in the font that can not be printed in a run (See print_run)
+        self.run_exclude = bytes([QUOTE])
+
+        # Bytes that are printed as a column of dots in graphics mode, and the
+        # value taken off them to get the column (See print_graphics_run)
+        self.graphics_bytes = bytes()
+        self.graphics_offset = 0
+
+        # Patterns that find runs of characters, for each font set
+        self.run_patterns = {}
+
+        # Tables of the functions that handle each character, for
+        # each mode (See dispatch_table)
+        self.tables = {}
+
+        # Table for the mode we are in, None when the mode has changed
+        self.table = None
+
         self.SEC_ADDR_GRAPHIC = 0
         self.SEC_ADDR_BUSNESS = 7
 
@@ -21,99 +48,397 @@ class print_profile:
         #self.font_set = None
 
 
-    def pre_chout(self, ch, add_data):
-        return False
+    """
+    Get the table of functions that handle each character, for the mode
+    the printer is in
+
+    Every function is called with (ch, add_data). The default is the
+    normal table, the printers override this for their other modes.
+    """
+    def dispatch_table(self):
+        return self.normal_table()
+
+    # Get the actions of the control codes, as a dictionary of code: function
+    def control_actions(self):
+        return {}
+
+    # The mode has changed, so get the table again for the next character
+    def mode_changed(self):
+        self.table = None
+
+    """
+    Get a table, making it the first time it is needed
+
+    key - Key of the table
+    make - Function that makes the table
+    """
+    def get_table(self, key, make):
+        table = self.tables.get(key)
+        if table is None:
+            table = make()
+            self.tables[key] = table
+        return table
+
+    """
+    Make a table that calls the same function for every character
+
+    function - Function to call
+    entries - Dictionary of characters that call a different function
+    """
+    def mode_table(self, function, entries = {}):
+        return self.change_table([function] * 256, entries)
+
+    """
+    Make a copy of a table, with some of the functions changed
+
+    table - Table to copy
+    entries - Dictionary of character: function
+    """
+    def change_table(self, table, entries):
+        table = list(table)
+        for ch, function in entries.items():
+            table[ch] = function
+        return table
+
+    # Get the table for normal mode, for the font set we are using
+    def normal_table(self):
+        return self.get_table(('normal', id(self.font_set)), self.make_normal_table)
+
+    # Make the table for normal mode. Characters in the font are printed,
+    # and everything else is a control code
+    def make_normal_table(self):
+        actions = self.control_actions()
+
+        table = []
+        for ch in range(256):
+            if ch in self.font_set:
+                table.append(self.print_character)
+            elif ch in actions:
+                table.append(self.control_entry(actions[ch]))
+            else:
+                table.append(self.print_control)
+        return table
 
-    def post_chout(self, ch, add_data):
+    # Make a table entry for a control code with an action,
+    # which can change the mode
+    def control_entry(self, action):
+        def entry(ch, add_data):
+            self.print_control(ch, add_data)
+            action(ch, add_data)
+            self.mode_changed()
+        return entry
+
+    # Print a character in the font
+    def print_character(self, ch, add_data):
+        # Check if we wrapped
+        if self.x >= self.page_width * SIZE:
+            self.x = 0
+            self.y += (self.line_space * SIZE)
+
+        # If we are adding to the buffer
+        if add_data:
+            # Check if we are at the end of the page, and start a new
+            # page if we are. The character is printed on the new page,
+            # so it is moved to its page data
+            if self.y >= self.page_height * SIZE:
+                self.parent.new_page(True)
+
+        # Toggle quote
+        if ch == QUOTE:
+            self.quote = not self.quote
+
+        # Print the character
+        self.output_character(ch)
+
+    # Print a control code, which is only seen in quote mode
+    def print_control(self, ch, add_data):
+        self.output_control(ch)
+
+        if ch == ESC:         # When followed by the POS code, start position of dot address
+            self.esc = True
+            self.mode_changed()
+
+    # Start an escape sequence
+    def start_escape(self, ch, add_data):
+        self.esc = True
+        self.mode_changed()
+
+    # An escape after an escape
+    def escape_escape(self, ch, add_data):
+        self.esc_esc = True
+        self.esc = False
+        self.mode_changed()
+
+    # The character does not continue the escape sequence,
+    # so handle it in the mode we are in now
+    def end_escape(self, ch, add_data):
+        self.esc = False
+        self.mode_changed()
+        self.process_character(ch, add_data)
+
+    # A character that does nothing
+    def ignore(self, ch, add_data):
         pass
 
+    # Check if the printer is not in a mode that changes how characters
+    # in the font are printed, so they can be printed in a run
+    def plain_mode(self):
+        return False
+
+    # Check if the printer is in graphics mode, and not in the middle of
+    # a command, so graphics bytes can be printed in a run
+    def graphics_mode(self):
+        return False
+
     def set_parent(self, parent):
         self.parent = parent
 
+    """
+    Get a copy of the state of the printer
+
+    The fonts are not copied, the font set is saved as the name of
+    the font it is set to.
+    """
+    def save_state(self):
+        state = {}
+        for name, value in vars(self).items():
+            # Skip the parent, the glyph cache, the dispatch tables and the fonts
+            if name == 'parent' or name == 'glyphs' or name == 'tables' or name == 'table' or isinstance(value, (dict, font_table)):
+                continue
+
+            if isinstance(value, list): value = list(value)
+            state[name] = value
+
+        # Save the name of the font set
+        for name, value in vars(self).items():
+            if value is self.font_set and name != 'font_set':
+                state['font_set'] = name
+
+        return state
+
+    """
+    Set the state of the printer to a copy saved with save_state
+
+    state - Saved state
+    """
+    def restore_state(self, state):
+        for name, value in state.items():
+            if isinstance(value, list): value = list(value)
+            setattr(self, name, value)
+
+        self.font_set = getattr(self, state['font_set'])
+        self.mode_changed()
+
     def clear_output(self):
         self.esc         = False
         self.quote       = False
+        self.mode_changed()
 
     def output_byte(self, byte):
         self.parent.output_byte(byte)
 
     # Output one charactor to the canvas and image
     def chout(self, ch, add_data = True):
-        page_width = self.page_width
-        page_height = self.page_height
-
         # If we want to append to the buffer
         # Set to False if we are redrawing
         if add_data:
             # If the current page does not match the last page, 
             # change to it
             if self.parent.page_current != self.parent.page_last:
-                self.page_current = self.parent.page_last
-                self.parent.page.current(self.parent.page_last)
-                self.parent.clear_canvas()
-                self.parent.redraw_page()
-                self.parent.page_current = self.parent.page_last
-                self.x = self.parent.x_last
-                self.y = self.parent.y_last
+                self.parent.restore_last_page()
 
             # If we reach the end of the page, make a
             # new page
             # Part of the line is at the bottom of the page
-            if self.y + 6 >= page_height * SIZE:
+            if self.y + 6 >= self.page_height * SIZE:
                 self.parent.new_page()
 
             # Append the character if it is not a formfeed
             #if ch != FF:
-            self.parent.page_data[self.parent.page_current].append(ch)
+            page = self.parent.page_current
+            self.parent.page_data[page].append(ch)
 
-        if self.esc:
-            if ch == ESC:
-                self.esc_esc = True
-                self.esc = False
-                return
+        self.process_character(ch, add_data)
 
-        if self.pre_chout(ch, add_data):
-            return
+        # If we are appending data, set the last x, y, and page
+        if add_data:
+            # The character started a new page that it is printed on
+            if self.parent.page_current != page and self.parent.page_carry:
+                self.parent.page_data[self.parent.page_current].append(self.parent.page_data[page].pop())
 
-        # if the character is in the font
-        if ch in self.font_set:
+            self.set_last()
+            self.parent.set_scroll()
 
-            # Toggle quote
-            if ch == QUOTE:
-                self.quote = not self.quote
+    """
+    Output a block of characters
 
-            # Check if we wrapped
-            if self.x >= page_width * SIZE:
-                self.x = 0
-                self.y += (self.line_space * SIZE)
+    This does the same as calling chout for every character, but the page
+    data is added a page at a time, and the print position is only saved
+    and shown once, at the end.
 
-            # If we are adding to the buffer
-            if add_data:
-                # Check if we are at the end of the page,
-                # and start a new page if we are
-                if self.y >= page_height * SIZE:
-                    self.parent.new_page()
+    data - Characters, as bytes, bytearray or memoryview
+    """
+    def chout_many(self, data):
+        parent = self.parent
+        data = memoryview(data)
+        if len(data) == 0: return
 
-            # Get the dot data of the character
-            f = self.font_set[ch]
+        # If the current page does not match the last page,
+        # change to it
+        if parent.page_current != parent.page_last:
+            parent.restore_last_page()
 
-            # Print the character
-            self.output_character(f)
+        # Characters from start on have not been added to the page data yet
+        start = 0
+        page = parent.page_current
+        bottom = self.page_height * SIZE
 
-        # If it is not a font character, it must be a control
-        # character
-        else:
-            self.output_control(ch)
+        i = 0
+        while i < len(data):
+            # If we reach the end of the page, make a
+            # new page
+            # Part of the line is at the bottom of the page
+            if self.y + 6 >= bottom:
+                parent.new_page()
 
-            if ch == ESC:         # When followed by the POS code, start position of dot address
-                self.esc = True
+                # The characters before this one were on the page we were on
+                parent.page_data[page] += data[start:i]
+                start = i
+                page = parent.page_current
 
-            self.post_chout(ch, add_data)
+            # Print as much of the line as we can at once
+            count = self.print_run(data, i)
+            if count > 0:
+                i += count
+                continue
 
-        # If we are appending data, set the last x, y, and page
-        if add_data:
-            self.parent.x_last = self.x
-            self.parent.y_last = self.y
-            self.parent.page_last = self.parent.page_current
-            self.parent.set_scroll()
+            self.process_character(data[i], True)
+
+            # The character started a new page. It stays on the page we
+            # were on, unless it is printed on the new page
+            if parent.page_current != page:
+                end = i if parent.page_carry else i + 1
+                parent.page_data[page] += data[start:end]
+                start = end
+                page = parent.page_current
+
+            i += 1
+
+        # Add the rest of the characters to the page data
+        parent.page_data[page] += data[start:]
+
+        self.set_last()
+        parent.set_scroll()
+
+    """
+    Print characters again, without adding them to the page data
+
+    data - Characters
+    start - Index of the first character
+    """
+    def redraw(self, data, start = 0):
+        i = start
+        while i < len(data):
+            count = self.print_run(data, i)
+            if count > 0:
+                i += count
+            else:
+                self.process_character(data[i], False)
+                i += 1
+
+    """
+    Print a run of characters in the font at once, as one strip of dots
+
+    This is only done in plain mode, and the run stops at the end of
+    the line, so the characters are printed the same as one at a time.
+
+    data - Characters
+    start - Index of the first character
+
+    Returns the number of characters printed, which can be 0
+    """
+    def print_run(self, data, start):
+        if self.graphics_mode(): return self.print_graphics_run(data, start)
+        if not self.plain_mode(): return 0
+
+        right = self.page_width * SIZE
+        if self.x >= right: return 0
+
+        # Find the characters that can be printed
+        match = self.run_pattern().match(data, start)
+        if match is None: return 0
+
+        # Only print the characters that start on this line
+        advance = SIZE * self.char_width * self.font_width
+        count = min(match.end() - start, math.ceil((right - self.x) / advance))
+
+        tiles = [self.glyphs.get(self.font_set, ch, self.reverse, self.char_width) for ch in data[start:start + count]]
+        self.parent.output_glyph(np.hstack(tiles))
+
+        self.x += count * advance
+        return count
+
+    """
+    Print a run of graphics bytes at once, as one strip of dots
+
+    Like print_run, the run stops at the end of the line. Graphics bytes
+    do not wrap, so the ones past the end of the line are left to be
+    printed one at a time.
+
+    data - Characters
+    start - Index of the first character
+
+    Returns the number of bytes printed, which can be 0
+    """
+    def print_graphics_run(self, data, start):
+        right = self.page_width * SIZE
+        if self.x >= right: return 0
+
+        # Find the graphics bytes
+        pattern = self.run_patterns.get('graphics')
+        if pattern is None:
+            pattern = re.compile(b'[' + re.escape(self.graphics_bytes) + b']+')
+            self.run_patterns['graphics'] = pattern
+
+        match = pattern.match(data, start)
+        if match is None: return 0
+
+        # Only print the columns that start on this line
+        step = SIZE * self.char_width
+        count = min(match.end() - start, math.ceil((right - self.x) / step))
+
+        columns = np.frombuffer(data[start:start + count], dtype=np.uint8) - self.graphics_offset
+        self.parent.output_columns(columns)
+
+        self.x += count * step
+        return count
+
+    # Get the pattern that finds runs of characters in the font set
+    def run_pattern(self):
+        pattern = self.run_patterns.get(id(self.font_set))
+        if pattern is None:
+            characters = bytes(ch for ch in sorted(self.font_set) if ch not in self.run_exclude)
+            pattern = re.compile(b'[' + re.escape(characters) + b']+')
+            self.run_patterns[id(self.font_set)] = pattern
+        return pattern
+
+    # Set the last x, y, and page, so we can go back to them
+    def set_last(self):
+        self.parent.x_last = self.x
+        self.parent.y_last = self.y
+        self.parent.page_last = self.parent.page_current
+
+    """
+    Print one character, after it has been added to the page data
+
+    ch - Character
+    add_data - Set to False if we are redrawing
+    """
+    def process_character(self, ch, add_data):
+        table = self.table
+        if table is None:
+            table = self.dispatch_table()
+            self.table = table
+
+        table[ch](ch, add_data)
 
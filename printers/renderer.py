@@ -0,0 +1,806 @@
+import os
+
+import numpy as np
+
+from printers.glyph_cache import column_tile
+from printers.display_list import display_list
+from printers.page_cache import page_cache
+
+from printers.printer_constants import *
+
+# The printer profiles, PIL and the exporters are only imported when they
+# are first used, so the window can be shown without waiting for them
+
+# Names of the printers that can be selected
+PRINTERS = ['MPS 801', 'MPS 802', 'VIC 1520']
+
+"""
+Load the bitmap used to draw one dot in the output, True is black
+
+size - Width and height of the dot, in pixels
+"""
+def load_dot_shape(size):
+    from PIL import Image
+
+    pixel = Image.open(os.path.join(os.path.dirname(__file__), 'printer_pixel.png'))
+    pixel = pixel.convert('L').resize((size, size), Image.BICUBIC)
+    return np.asarray(pixel) < DOT_THRESHOLD
+
+"""
+Headless rendering engine
+
+This holds the pages of print data, and the dots of the current page. The
+dots are kept at the resolution of the printer, one array element per dot,
+and are only scaled up to an image when the page is exported. The lines of
+the plotter are kept in a display list. The printer profile sends all of
+its output here. A view (the Tk window) can be
+attached to get notified when something changes, but it is not required, so
+data can be rendered on a machine without a display.
+
+The view needs to provide the following methods:
+
+    clear_canvas()                      - The current page was cleared
+    add_page(page)                      - A new page was added
+    select_page(page)                   - The page has been selected
+    refresh()                           - The page has changed (See take_dirty)
+    set_scroll()                        - The print position has changed
+
+The view is told about every change, so it should only take note of it, and
+update the display later.
+"""
+class Renderer:
+    """
+    view - View to notify of changes, or None
+    cache_size - Memory for rendered pages, in bytes (See page_cache)
+    """
+    def __init__(self, view = None, cache_size = PAGE_CACHE_SIZE):
+        self.view = view
+        self.printer_profile = None
+        self.printer_name = None
+
+        self.dots = None
+
+        # Region of the page that has changed since the view was refreshed
+        self.dirty = None
+
+        # Lines drawn by the plotter on the current page
+        self.display_list = display_list()
+
+        self.page_current = 0
+        self.page_last = 0
+        self.x_last = 0
+        self.y_last = 0
+
+        # Set when we are redrawing a page from the page data
+        self.redrawing = False
+
+        # Set when the last new page was started by a character printed on it
+        self.page_carry = False
+
+        # Add buffer for the current page
+        self.page_data = []
+        self.page_data.append(bytearray())
+        self.page_data[self.page_current].append(0)
+
+        # State of the printer at the start of each page
+        self.page_state = []
+
+        # Pages that have already been drawn
+        self.page_cache = page_cache(cache_size, PAGE_CACHE_RAW)
+
+        # PDF file the pages are added to when they are finished (See save_pdf)
+        self.pdf = None
+        self.pdf_name = None
+        self.pdf_pages = 0
+        self.pdf_mark = None
+
+        # Processes that draw the pages of the PDF file, started when they
+        # are first needed, and kept for the next save (See process_pool)
+        self.pool = None
+        self.pool_size = 0
+
+        # Resolution of the saved pages (See set_dpi)
+        self.dpi = OUTPUT_RESOLUTION
+
+        # Bitmaps to draw the dot, for each size
+        self.dot_shapes = {}
+
+    """
+    Select the printer profile
+
+    printer - Name of the printer (See PRINTERS)
+    """
+    def select_printer(self, printer):
+        if printer == 'MPS 801':
+            from printers.mps801 import mps801
+            self.printer_profile = mps801()
+        elif printer == 'MPS 802':
+            from printers.mps802 import mps802
+            self.printer_profile = mps802()
+        elif printer == 'VIC 1520':
+            from printers.vic1520 import vic1520
+            self.printer_profile = vic1520()
+        else:
+            raise ValueError("Unknown printer: {name}".format(name=printer))
+
+        self.printer_name = printer
+        self.printer_profile.set_parent(self)
+
+        # Create the dots for the page, with room for a character
+        # that is printed at the bottom of the page
+        self.dots = np.zeros(
+            (self.printer_profile.page_height + 8, self.printer_profile.page_width),
+            dtype=np.uint8
+        )
+
+        # Start with no output
+        self.reset_pages()
+
+    # Start over with one empty page
+    def reset_pages(self):
+        self.page_current = 0
+        self.page_data = []
+        self.page_data.append(bytearray())
+        self.page_data[self.page_current].append(0)
+
+        self.x_last = 0
+        self.y_last = 0
+        self.page_last = 0
+
+        # Save the state of the printer for the first page
+        self.page_state = [self.printer_profile.save_state()]
+
+        # None of the pages have been drawn
+        self.page_cache.clear()
+
+        # Leave the PDF file as it was last saved
+        self.close_pdf()
+
+    # Clear the current page
+    def clear_canvas(self):
+        self.dots.fill(0)
+        self.dirty = None
+        self.display_list = display_list()
+
+        if self.view is not None:
+            self.view.clear_canvas()
+
+    # Redraw the currently selected page
+    def redraw_page(self):
+
+        # Clear the page
+        self.clear_canvas()
+
+        # Pages before the last one do not change, so use
+        # the cached page if we have it
+        finished = self.page_current != self.page_last
+        cached = self.page_cache.get(self.page_current) if finished else None
+
+        if cached is not None:
+            self.dots[:] = cached[0]
+            self.display_list = cached[1]
+        else:
+            self.draw_page_data()
+
+            if finished:
+                self.page_cache.put(self.page_current, self.dots, self.display_list)
+
+        # Show the whole page at once
+        if self.view is not None:
+            self.mark_dirty(0, 0, self.dots.shape[0], self.dots.shape[1])
+            self.view.refresh()
+
+    # Draw the current page from the page data
+    def draw_page_data(self):
+        # Get the current page data
+        pd = self.page_data[self.page_current]
+
+        # Set the printer to the state it was in when the page started
+        self.printer_profile.restore_state(self.page_state[self.page_current])
+
+        # Set x and y to the top of the page
+        self.printer_profile.x = pd[0]
+        self.printer_profile.y = 0
+
+        # Process all the data for the page. New pages are
+        # ignored, since the page break is already in the data
+        self.redrawing = True
+        try:
+            self.printer_profile.redraw(pd, 1)
+        finally:
+            self.redrawing = False
+
+    # Go back to the last page, so we can add data to it
+    def restore_last_page(self):
+        self.page_current = self.page_last
+
+        if self.view is not None:
+            self.view.select_page(self.page_last)
+
+        self.redraw_page()
+        self.printer_profile.x = self.x_last
+        self.printer_profile.y = self.y_last
+
+    """
+    Create a new page
+
+    carry - The character that started the page is printed on it, so it
+            goes in the page data of the new page (See print_profile.chout)
+    """
+    def new_page(self, carry = False):
+        # The page break is already in the page data
+        if self.redrawing: return
+        self.page_carry = carry
+
+        # The last page is finished, so keep what was drawn on it
+        self.page_cache.put(self.page_last, self.dots, self.display_list)
+
+        # Add it to the PDF file, if we are saving to one
+        if self.pdf is not None:
+            self.pdf.rewind(self.pdf_mark)
+            self.add_pdf_page()
+            self.pdf.finish()
+
+        # Add data array to the page, this is now the last page
+        self.page_current = len(self.page_data)
+        self.page_last = self.page_current
+        self.page_data.append(bytearray())
+        self.page_data[self.page_current].append(0)
+
+        if self.view is not None:
+            self.view.add_page(self.page_current)
+
+        # Clear the page
+        self.clear_canvas()
+
+        # Set the x and y position to the top of the page
+        self.printer_profile.x = 0
+        self.printer_profile.y = 0
+
+        # Save the state of the printer, so the page can be redrawn
+        self.page_state.append(self.printer_profile.save_state())
+
+    # Output one vertical line of the character
+    def output_byte(self, byte):
+        profile = self.printer_profile
+        self.output_glyph(column_tile(byte, profile.font_height, profile.char_width))
+
+    """
+    Output a run of column bytes, starting at the print position
+
+    columns - Sequence of column bytes
+    """
+    def output_columns(self, columns):
+        profile = self.printer_profile
+        columns = np.frombuffer(bytes(columns), dtype=np.uint8)
+        self.output_glyph(column_tile(columns, profile.font_height, profile.char_width))
+
+    """
+    Output the same column byte a number of times
+
+    byte - Column byte
+    count - Number of times to output it
+    """
+    def repeat_column(self, byte, count):
+        profile = self.printer_profile
+        tile = column_tile(byte, profile.font_height, profile.char_width)
+        self.output_glyph(np.tile(tile, (1, count)))
+
+    """
+    Copy a tile of dots to the page, at the print position
+
+    tile - Array of dots (See glyph_cache)
+    """
+    def output_glyph(self, tile):
+        x = self.printer_profile.x
+        y = self.printer_profile.y
+
+        # Get the position of the top left dot
+        column = int(x) // SIZE
+        row = int(y / SIZE)
+        rows, columns = self.dots.shape
+
+        if row >= 0 and row < rows and column >= 0 and column < columns:
+            # Copy the part of the tile that fits on the page
+            part = tile[:rows - row, :columns - column]
+            self.dots[row:row + part.shape[0], column:column + part.shape[1]] |= part
+
+            if self.view is not None and not self.redrawing:
+                self.mark_dirty(row, column, row + part.shape[0], column + part.shape[1])
+
+    """
+    Add a rectangle of dots to the region that has changed
+
+    top, left - First row and column
+    bottom, right - Row and column after the last ones
+    """
+    def mark_dirty(self, top, left, bottom, right):
+        if self.dirty is None:
+            self.dirty = [top, left, bottom, right]
+        else:
+            dirty = self.dirty
+            dirty[0] = min(dirty[0], top)
+            dirty[1] = min(dirty[1], left)
+            dirty[2] = max(dirty[2], bottom)
+            dirty[3] = max(dirty[3], right)
+
+    """
+    Get the region of the page that has changed, and start over
+
+    Returns [top, left, bottom, right], or None if nothing changed
+    """
+    def take_dirty(self):
+        dirty = self.dirty
+        self.dirty = None
+        return dirty
+
+    """
+    Get an image of a rectangle of dots, to show on the display
+
+    The image is a binary PGM, with every dot SIZE pixels square
+
+    top, left - First row and column
+    bottom, right - Row and column after the last ones
+    """
+    def display_image(self, top, left, bottom, right):
+        dots = self.dots[top:bottom, left:right]
+        pixels = np.where(dots, 0, 255).astype(np.uint8)
+        pixels = np.repeat(np.repeat(pixels, SIZE, axis=0), SIZE, axis=1)
+
+        height, width = pixels.shape
+        return "P5 {w} {h} 255\n".format(w=width, h=height).encode('ascii') + pixels.tobytes()
+
+    # Draw a line with the plotter pen
+    def draw_line(self, x1, y1, x2, y2, color):
+        self.display_list.add(x1, y1, x2, y2, color)
+
+        if self.view is not None and not self.redrawing:
+            self.view.refresh()
+
+    # Draw a list of lines of the plotter, each one (x1, y1, x2, y2, color)
+    def draw_lines(self, lines):
+        self.display_list.extend(lines)
+
+        if self.view is not None and not self.redrawing:
+            self.view.refresh()
+
+    # Let the view follow the print position
+    def set_scroll(self):
+        if self.view is not None:
+            self.view.set_scroll()
+
+    # Output a block of data
+    def write(self, data):
+        self.printer_profile.chout_many(bytes(data))
+
+    # Clear the output from the pages
+    def clear_output(self):
+        # Clear the page
+        self.clear_canvas()
+
+        # Reset all the values
+        self.printer_profile.x = 0
+        self.printer_profile.y = 0
+        self.printer_profile.clear_output()
+
+        # Start over with one empty page
+        self.reset_pages()
+
+    """
+    Redraw every page, and return a list of what render returns for each one
+
+    The current page is redrawn when we are done
+
+    render - Function to call when a page has been redrawn
+    pages - Page numbers to redraw, or None for all of them
+    """
+    def render_each_page(self, render, pages = None):
+        if pages is None:
+            pages = range(0,len(self.page_data))
+
+        # Save the current page
+        current_page = self.page_current
+
+        # Iterate through the pages
+        results = []
+        for i in pages:
+
+            # Set the current page to the index and redraw it
+            self.page_current = i
+            self.redraw_page()
+            results.append(render())
+
+        # Restore the current page and redraw it
+        self.page_current = current_page
+        self.redraw_page()
+
+        return results
+
+    # Render all the pages, and return a list of images
+    def render_pages(self):
+        return self.render_each_page(self.page_image)
+
+    # Render all the pages, and return the display list of each one
+    def render_display_lists(self):
+        return self.render_each_page(lambda: self.display_list)
+
+    """
+    Set the resolution of the saved pages
+
+    The size of a dot is rounded to whole pixels, so the resolution
+    of the pages can be a little different (See resolution)
+
+    dpi - Pixels per inch (See OUTPUT_QUALITY)
+    """
+    def set_dpi(self, dpi):
+        if dpi != self.dpi:
+            # The pages already in the PDF file are at the old resolution
+            self.close_pdf()
+            self.dpi = dpi
+
+    # Get the size of a dot in the saved pages, in pixels
+    def dot_size(self):
+        return max(1, round(self.dpi * OUTPUT_SIZE / OUTPUT_RESOLUTION))
+
+    # Get the resolution of the saved pages, in pixels per inch
+    def resolution(self):
+        return self.dot_size() * OUTPUT_RESOLUTION / OUTPUT_SIZE
+
+    # Get the bitmap to draw a dot in the saved pages
+    def dot_shape(self, size):
+        shape = self.dot_shapes.get(size)
+        if shape is None:
+            shape = load_dot_shape(size)
+            self.dot_shapes[size] = shape
+        return shape
+
+    """
+    Get an image of the current page, at the resolution set by set_dpi
+
+    The dots of the page are scaled up, and every dot is replaced by the
+    dot bitmap, in one pass over the image. The image only has black and
+    white pixels (mode 1), unless there are lines of the plotter, which
+    are drawn on top in color.
+    """
+    def page_image(self):
+        from PIL import Image
+
+        page_height = self.printer_profile.page_height
+        dots = self.dots[:page_height].astype(bool)
+        rows, columns = dots.shape
+
+        size = self.dot_size()
+        shape = self.dot_shape(size)
+
+        # Every pixel is black if its dot is printed, and it is black in
+        # the dot bitmap. Row and column of the dot, then of the pixel in it
+        pixels = dots[:, None, :, None] & shape[None, :, None, :]
+        image = Image.fromarray(~pixels.reshape(rows * size, columns * size))
+
+        if len(self.display_list) > 0:
+            image = image.convert("RGB")
+            self.draw_plot(image, size)
+
+        return image
+
+    """
+    Draw the lines of the plotter on an image
+
+    The pen is one dot wide, and the lines are drawn as polylines,
+    so each line is only one call
+
+    image - Image to draw on
+    dot_size - Size of a dot in the image, in pixels
+    """
+    def draw_plot(self, image, dot_size):
+        from PIL import ImageDraw
+
+        draw = ImageDraw.Draw(image)
+
+        # Convert from display coordinates, to the middle of the pen
+        scale = dot_size / SIZE
+        offset = dot_size / 2
+
+        for color, points in self.display_list.polylines():
+            points = [p * scale + offset for p in points]
+            draw.line(points, fill=color, width=dot_size, joint='curve')
+
+    """
+    Save all the pages as a PDF file
+
+    The file is kept open after it is saved, and every page is added to it
+    when it is finished. Saving to the same file again only has to add the
+    last page, which can still change.
+
+    output_file - Path of the file
+    processes - Number of processes to draw the pages in
+    """
+    def save_pdf(self, output_file, processes = 1):
+        from printers.pdf_writer import pdf_writer
+
+        # Start a new file
+        if self.pdf is None or self.pdf_name != output_file:
+            self.close_pdf()
+            self.pdf = pdf_writer(output_file)
+            self.pdf_name = output_file
+            self.pdf_pages = 0
+            self.pdf_mark = self.pdf.mark()
+
+        # Remove the last page from the last time we saved
+        self.pdf.rewind(self.pdf_mark)
+
+        # Draw the finished pages that are not in the file yet in other processes.
+        # Plots are quick to save, so they are always done here
+        finished = range(self.pdf_pages, self.page_last)
+        if processes > 1 and len(finished) > 1 and not self.printer_profile.plotter:
+            self.add_parallel_pdf_pages(finished, processes)
+
+        # Add the pages that are not in the file yet
+        self.render_each_page(
+            lambda: self.add_pdf_page(self.page_current != self.page_last),
+            range(self.pdf_pages, self.page_last + 1)
+        )
+
+        self.pdf.finish()
+
+    """
+    Add the current page to the PDF file
+
+    Plots are saved as lines, and everything else as an image.
+
+    finished - The page will not change, so keep it in the file
+    """
+    def add_pdf_page(self, finished = True):
+        from printers import vector_export
+
+        profile = self.printer_profile
+
+        if profile.plotter:
+            vector_export.add_pdf_page(self.pdf, self.display_list, profile.page_width, profile.page_height)
+        else:
+            self.pdf.add_image_page(self.page_image(), self.resolution())
+
+        # The next page goes after the finished ones
+        if finished:
+            self.keep_pdf_page()
+
+    """
+    Draw pages in a pool of processes, and add them to the PDF file in order
+
+    Each page is drawn from its page data, starting with the state of the
+    printer at the start of the page, so the pages do not depend on each other.
+
+    pages - Page numbers of finished pages
+    processes - Number of processes
+    """
+    def add_parallel_pdf_pages(self, pages, processes):
+        jobs = [(self.printer_name, self.dpi, bytes(self.page_data[i]), self.page_state[i]) for i in pages]
+
+        for encoded in self.process_pool(processes).map(render_pdf_image, jobs):
+            self.pdf.add_encoded_page(encoded, self.resolution())
+            self.keep_pdf_page()
+
+    """
+    Get the pool of processes that draw pages
+
+    The pool is started the first time, and used again by the next saves,
+    unless they want a different number of processes.
+
+    processes - Number of processes
+    """
+    def process_pool(self, processes):
+        from concurrent.futures import ProcessPoolExecutor
+
+        if self.pool is None or self.pool_size != processes:
+            self.close_pool()
+            self.pool = ProcessPoolExecutor(processes)
+            self.pool_size = processes
+
+        return self.pool
+
+    # Stop the processes that draw pages
+    def close_pool(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+            self.pool_size = 0
+
+    """
+    Get the number of finished pages that are not in the PDF file yet
+
+    output_file - Path of the file
+    """
+    def unsaved_pdf_pages(self, output_file):
+        if self.pdf is None or self.pdf_name != output_file:
+            return self.page_last
+        return self.page_last - self.pdf_pages
+
+    # Keep the last page added to the PDF file, it is finished
+    def keep_pdf_page(self):
+        self.pdf_pages += 1
+        self.pdf_mark = self.pdf.mark()
+
+    # Stop adding pages to the PDF file
+    def close_pdf(self):
+        if self.pdf is not None:
+            self.pdf.close()
+            self.pdf = None
+            self.pdf_name = None
+
+    """
+    Save all the pages as a TIFF file, with one image for each page
+
+    Black and white pages are compressed with CCITT group 4
+
+    output_file - Path of the file
+    """
+    def save_tiff(self, output_file):
+        from PIL import TiffImagePlugin
+
+        with TiffImagePlugin.AppendingTiffWriter(output_file, True) as tiff:
+            self.render_each_page(lambda: self.add_tiff_page(tiff))
+
+    # Add the current page to a TIFF file
+    def add_tiff_page(self, tiff):
+        image = self.page_image()
+        compression = 'group4' if image.mode == '1' else 'tiff_deflate'
+
+        resolution = self.resolution()
+        image.save(tiff, 'TIFF', compression=compression, dpi=(resolution, resolution))
+        tiff.newFrame()
+
+    # Save the lines of all the pages as an SVG file
+    def save_svg(self, output_file):
+        from printers import vector_export
+
+        profile = self.printer_profile
+        vector_export.write_svg(self.render_display_lists(), profile.page_width, profile.page_height, output_file)
+
+    # Get a block of text from from the line
+    def get_block(self, line):
+
+        # Start at 0
+        cnt = 0
+
+        # Find the start of the block or a comment
+        while cnt < len(line) and (line[cnt] != '{' and line[cnt] != '#'):
+            cnt += 1
+
+        # We found a comment, return
+        if cnt < len(line):
+            if line[cnt] == '#': return ['','']
+
+            # Get the line from the current position
+            block = line[cnt:]
+
+            # Get end of the block
+            cnt = 0
+            while cnt < len(block) and block[cnt] != '}':
+                cnt += 1
+
+            # Get the block
+            block = block[:cnt+1]
+
+            # Remove the block from the line
+            line = line[cnt+1:]
+        else:
+            block = ''
+            line = ''
+
+        return [block, line]
+
+    # Process the block
+    def process_block(self, block):
+
+        # Remove the end of block
+        block = block[0:len(block)-1]
+
+        # If string mode
+        if block[0:2] == "{*":
+
+            # Remove the start of block
+            block = block[2:]
+
+            # Print the output until the end of the block
+            self.write(ord(c) for c in block)
+
+            return
+
+        # If hex mode
+        if block[0:2] == "{x":
+            # Remove the start of the block
+            block = block[2:]
+
+            # Remove any spaces in the block
+            block = block.replace(" ", "")
+
+            # Make an even set up hex numbers
+            if len(block) % 2 == 2: block += '0'
+
+            # Output each of the hex numbers
+            self.write(int(block[i:i+2],16) for i in range(0,len(block),2))
+            return
+
+        # If decimal character mode
+        if block[0] == '{':
+
+            # Remove the start of the block
+            block = block[ 1:]
+
+            # Remove any spaces in the block
+            block = block.replace(" ", "")
+
+            # Split the values on comma
+            ch_list = block.split(',')
+
+            # Print the output
+            self.write(int(c) for c in ch_list)
+
+
+    # Read the data file, and process each block
+    def read_data_file(self, data_file):
+
+        # Open the file and read the lines
+        with open(data_file) as f:
+            lines = f.read().splitlines()
+
+        # for each line process the block
+        for line in lines:
+
+            # Remove leading and trailing spaces
+            line = line.strip(' ')
+
+            # While we have data in the line
+            while len(line) > 0:
+
+                # Get the block and the left over line
+                result = self.get_block(line)
+                block = result[0]
+                line = result[1]
+
+                # If we have a block process it
+                if (len(block) > 0):
+                    self.process_block(block)
+
+    # Read a file of hex printer data
+    def read_hex_file(self, hex_file):
+        # Open the file and read the lines
+        with open(hex_file) as f:
+            lines = f.read().splitlines()
+
+        # for each line process the block
+        for line in lines:
+
+            # Remove leading and trailing spaces
+            line = line.replace(' ','')
+
+            self.write(int(line[h:h+2],16) for h in range(0,len(line),2))
+
+# Renderer used to draw pages in a process of the pool (See add_parallel_pdf_pages)
+worker_renderer = None
+
+"""
+Draw a page, and compress the image for a PDF file
+
+job - (printer name, resolution, page data, state of the printer at the start of the page)
+"""
+def render_pdf_image(job):
+    global worker_renderer
+    from printers.pdf_writer import encode_image
+
+    printer, dpi, data, state = job
+
+    if worker_renderer is None or worker_renderer.printer_name != printer:
+        worker_renderer = Renderer(cache_size=0)
+        worker_renderer.select_printer(printer)
+
+    # Make the page the only one
+    renderer = worker_renderer
+    renderer.page_data = [bytearray(data)]
+    renderer.page_state = [state]
+    renderer.page_current = 0
+    renderer.page_last = 0
+    renderer.dpi = dpi
+
+    renderer.redraw_page()
+    return encode_image(renderer.page_image())
@@ -0,0 +1,124 @@
+import threading
+
+from printers.printer_constants import *
+
+"""
+Ring buffer of bytes, that one thread writes to and another reads from
+
+The buffer has a fixed size. When it is full, the writer waits for the
+reader to make room, so no bytes are lost.
+"""
+class ring_buffer:
+    def __init__(self, size):
+        self.buffer = bytearray(size)
+        self.start = 0
+        self.length = 0
+        self.changed = threading.Condition()
+
+    # Get the number of bytes in the buffer
+    def __len__(self):
+        return self.length
+
+    """
+    Add bytes to the buffer, waiting for room if it is full
+
+    data - Bytes to add
+    stop - Event that stops the waiting, the rest of the data is not added
+    """
+    def write(self, data, stop):
+        data = memoryview(data)
+        size = len(self.buffer)
+
+        while len(data) > 0:
+            with self.changed:
+                # Wait for the reader to make room
+                while self.length == size:
+                    if stop.is_set(): return
+                    self.changed.wait(SERIAL_TIMEOUT)
+
+                # Copy up to the end of the free space, or the end of the buffer
+                end = (self.start + self.length) % size
+                count = min(len(data), size - self.length, size - end)
+                self.buffer[end:end + count] = data[:count]
+                self.length += count
+
+            data = data[count:]
+
+    """
+    Take bytes from the buffer, without waiting
+
+    count - Most bytes to take
+
+    Returns the bytes, which can be empty
+    """
+    def read(self, count):
+        size = len(self.buffer)
+
+        with self.changed:
+            count = min(count, self.length)
+
+            # The bytes can go past the end of the buffer, and start again at the start
+            first = min(count, size - self.start)
+            data = bytes(self.buffer[self.start:self.start + first]) + bytes(self.buffer[:count - first])
+
+            self.start = (self.start + count) % size
+            self.length -= count
+
+            # Let the writer know there is room
+            self.changed.notify()
+
+        return data
+
+"""
+Read a serial port in the background
+
+A thread reads everything that arrives on the port, as soon as it arrives,
+and puts it in a ring buffer. Printing takes it from the buffer, so the
+port is still read while the display is busy.
+
+If the port fails, the thread stops and the error is kept in error.
+"""
+class serial_reader:
+    """
+    port - Serial port that is open
+    size - Size of the buffer
+    """
+    def __init__(self, port, size = SERIAL_BUFFER_SIZE):
+        self.port = port
+        self.buffer = ring_buffer(size)
+        self.error = None
+        self.stopped = threading.Event()
+
+        # Wake up now and again, to see if we should stop
+        self.port.timeout = SERIAL_TIMEOUT
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # Get the number of bytes waiting to be printed
+    def __len__(self):
+        return len(self.buffer)
+
+    # Read the port until we are stopped
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                # Wait for at least one byte, and take all the others that came with it
+                data = self.port.read(max(1, self.port.in_waiting))
+                if len(data) > 0:
+                    self.buffer.write(data, self.stopped)
+        except OSError as e:
+            self.error = e
+
+    """
+    Take bytes that have been read
+
+    count - Most bytes to take
+    """
+    def read(self, count):
+        return self.buffer.read(count)
+
+    # Stop reading, and wait for the thread to finish
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
@@ -0,0 +1,97 @@
+from PIL import ImageColor
+
+from printers.printer_constants import *
+
+"""
+Export plotter pages as vector graphics
+
+The pages are display lists (See display_list), in display coordinates,
+which are SIZE times the plotter steps. A plotter step is 0.2 mm, and the
+pen is one step wide.
+"""
+
+# Size of a plotter step, in points (0.2 mm)
+STEP_POINTS = 72 / 127
+
+# Size of a plotter step, in mm
+STEP_MM = 0.2
+
+# Format a coordinate, without trailing zeros
+def number(value, places = 2):
+    return ('%.*f' % (places, value)).rstrip('0').rstrip('.')
+
+"""
+Write the pages to an SVG file
+
+The pages are put one after the other, like on the paper roll.
+
+pages - List of display lists
+page_width, page_height - Size of a page, in plotter steps
+output_file - Path of the file
+"""
+def write_svg(pages, page_width, page_height, output_file):
+    width = page_width * SIZE
+    height = page_height * SIZE
+
+    with open(output_file, 'wt') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" width="{w}mm" height="{h}mm" viewBox="0 0 {vw} {vh}">\n'.format(
+            w=number(page_width * STEP_MM),
+            h=number(page_height * STEP_MM * len(pages)),
+            vw=width,
+            vh=height * len(pages)
+        ))
+
+        # Lines off the page are cut off
+        f.write('<defs><clipPath id="page"><rect width="{w}" height="{h}"/></clipPath></defs>\n'.format(w=width, h=height))
+
+        for page, lines in enumerate(pages):
+            f.write('<g transform="translate(0 {y})" clip-path="url(#page)">\n'.format(y=height * page))
+            f.write('<g fill="none" stroke-width="{s}" stroke-linecap="round" stroke-linejoin="round">\n'.format(s=SIZE))
+
+            for color, points in lines.polylines():
+                f.write('<polyline stroke="{c}" points="{p}"/>\n'.format(
+                    c=color,
+                    p=' '.join(number(p) for p in points)
+                ))
+
+            f.write('</g>\n</g>\n')
+
+        f.write('</svg>\n')
+
+"""
+Add a page to a PDF file, with the lines as vector paths
+
+pdf - PDF file (See pdf_writer)
+lines - Display list of the page
+page_width, page_height - Size of a page, in plotter steps
+"""
+def add_pdf_page(pdf, lines, page_width, page_height):
+    width = page_width * STEP_POINTS
+    height = page_height * STEP_POINTS
+    scale = STEP_POINTS / SIZE
+
+    # Use display coordinates, with y going down the page,
+    # and a round pen one step wide
+    # The scale is multiplied by every coordinate, so it needs more places
+    content = [
+        '{s} 0 0 {n} 0 {h} cm'.format(s=number(scale, 8), n=number(-scale, 8), h=number(height)),
+        '1 J 1 j {w} w'.format(w=SIZE)
+    ]
+
+    color = None
+    for line_color, points in lines.polylines():
+        # Change the pen
+        if line_color != color:
+            color = line_color
+            r, g, b = ImageColor.getrgb(color)[:3]
+            content.append('{r} {g} {b} RG'.format(r=number(r / 255), g=number(g / 255), b=number(b / 255)))
+
+        # Draw the line
+        path = [number(points[0]) + ' ' + number(points[1]) + ' m']
+        for i in range(2, len(points), 2):
+            path.append(number(points[i]) + ' ' + number(points[i + 1]) + ' l')
+        path.append('S')
+        content.append(' '.join(path))
+
+    return pdf.add_page(width, height, '\n'.join(content).encode('ascii'))
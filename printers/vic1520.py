@@ -1,8 +1,7 @@
 from printers.printer_constants import *
 from printers.printer_profile import print_profile
-from printers.fonts import font_1520_uppercase
-from printers.fonts import font_1520_lowercase
-from printers.fonts import control_character
+from printers.font_table import load_font
+from printers.font_table import control_character
 import re
 
 """
@@ -19,22 +18,28 @@ class vic1520(print_profile):
     def __init__(self):
         super().__init__()
         # Fonts
-        self.font_uppercase = font_1520_uppercase
-        self.font_lowercase = font_1520_lowercase
+        self.font_uppercase = load_font('font_1520_uppercase')
+        self.font_lowercase = load_font('font_1520_lowercase')
+
+        # The printer draws lines
+        self.plotter = True
 
         # List of colors
-        self.colors = ['black', 'blue', 'green', 'red']
+        self.colors = PEN_COLORS
 
         # Character size factors
         self.char_size_values = [0.5, 1.0, 2.0, 4.0]
 
         # Printer values
-        self.page_width    = 480      # Width of page
-        self.page_height   = 999 * 2  # Length of page
+        self.page_width, self.page_height = PAGE_SIZES['VIC 1520'] # Width and length of page
         self.line_space    = 0        # Line spacing
         self.mult          = 4        # Multiplier
         self.char_width    = 12       # Width of character
         self.color         = 0        # First color
+        self.rotated       = False    # Characters are rotated 90 degrees to the right
+
+        # Lines of the characters, for each case, size, color and rotation (See stroke_table)
+        self.strokes = {}
 
         # Mode flags
         self.xyplot = False           # X/Y plot mode flag
@@ -143,96 +148,83 @@ class vic1520(print_profile):
         self.line_space = 16 * self.char_size
 
     def draw_line(self, x1, y1, x2, y2, color):
-        self.parent.canvas.create_line(x1    , y1    , x2    , y2    , fill=color, width=1)
-        self.parent.canvas.create_line(x1 + 1, y1    , x2 + 1, y2    , fill=color, width=1)
-        self.parent.canvas.create_line(x1    , y1 + 1, x2    , y2 + 1, fill=color, width=1)
-        self.parent.canvas.create_line(x1 + 1, y1 + 1, x2 + 1, y2 + 1, fill=color, width=1)
-        self.parent.canvas.update()
+        self.parent.draw_line(x1, y1, x2, y2, color)
+
+    """
+    Get the lines of the characters in the font, size, color and
+    rotation that are selected
+
+    The table is made the first time it is needed, and is kept for
+    the next time. The size is only changed by the character size
+    index, since mult does not change.
 
+    Returns a dictionary of character: list of lines (See decode_strokes)
     """
-    Draw a character and the specified location, with a
-    certain scale
+    def stroke_table(self):
+        scale = self.mult * self.char_size
+        key = (id(self.font_set), scale, self.color % 4, self.rotated)
+        table = self.strokes.get(key)
+        if table is None:
+            color = self.colors[self.color % 4]
+            table = {ch: decode_strokes(self.font_set[ch], scale, color, self.rotated) for ch in self.font_set}
+            self.strokes[key] = table
+        return table
 
-    f - Character data
+    """
+    Draw a character at the specified location
+
+    strokes - Lines of the character (See stroke_table)
     x - X position
     y - Y position
-    mult - Scaling factor
 
     """
-    def draw_character(self, f, x, y, mult):
-        # Font format:
-        #
-        # %EXXXYYYP
-        # E - last command in list (1)
-        # X - x coordinate (0-7)
-        # Y - y coordinate (0-7)
-        # P - use pen (1), or just move (0)
-
+    def draw_character(self, strokes, x, y):
         # Set x to the height of the character
         if self.y == 0:
             self.y = self.line_space * SIZE
             y = self.y
 
-        # Set start position
-        start_x = 0
-        start_y = 0
-
-        # Draw the chararacter
-        for i in f:
-
-            # Get the end position
-            end_x = ((i & 0x70) >> 4) * mult
-            end_y = ((i & 0x0e) >> 1) * mult
-
-            # If the low bit is set, we are drawing
-            if i & 1:
-
-                # Set the color
-                color = self.colors[self.color % 4]
-
-                # Calculate the start and end positions
-                x1 = x + start_x
-                y1 = y - start_y
-                x2 = x + end_x
-                y2 = y - end_y
-
-                # Draw the line
-                self.draw_line(x1, y1, x2, y2, color)
-
-            # Make the last postions the first
-            start_x = end_x
-            start_y = end_y
-
-        #self.parent.canvas.update()
+        # Move the lines to the position, and draw them all at once
+        self.parent.draw_lines([(x + x1, y - y1, x + x2, y - y2, color) for x1, y1, x2, y2, color in strokes])
 
     """
     Output a character
 
-    f - Character data
+    ch - Character
     """
-    def output_character(self, f):
-        self.draw_character(f, self.x, self.y, self.mult * self.char_size)
+    def output_character(self, ch):
+        self.draw_character(self.stroke_table()[ch], self.x, self.y)
 
         # Move past the character
-        self.x += SIZE * self.char_width * self.char_size
+        self.next_character()
+
+    """
+    Move past a character. Rotated characters are printed
+    down the page, so the pen moves down instead of right.
+    """
+    def next_character(self):
+        if self.rotated:
+            self.y += SIZE * self.char_width * self.char_size
+        else:
+            self.x += SIZE * self.char_width * self.char_size
 
     def output_control(self, ch):
         if self.quote and ch in control_character:
             # Print the character
             o = control_character[ch]
-            f = self.font_set[o]
+            strokes = self.stroke_table()
 
             # Draw the character
-            self.draw_character(f, self.x, self.y, self.mult * self.char_size)
+            self.draw_character(strokes[o], self.x, self.y)
 
             # Underline it
             if self.font_set == self.font_uppercase:
-                self.draw_character(self.font_set[220], self.x, self.y, self.mult * self.char_size)
+                self.draw_character(strokes[220], self.x, self.y)
             else:
-                self.draw_character(self.font_set[92], self.x, self.y, self.mult * self.char_size)
+                self.draw_character(strokes[92], self.x, self.y)
 
             # Move past the character
-            self.x += SIZE * self.char_width * self.char_size
+            self.next_character()
 
     """
     Get the number data for from the string, and put it in a list
@@ -256,171 +248,33 @@ class vic1520(print_profile):
         return [int(d) for d in data.strip().split(" ")]
 
     """
-    Called at the beginning of chout
+    Get the table of functions that handle each character, for the mode
+    the printer is in (See print_profile.dispatch_table)
 
-    ch - Character
-    add_data = Add data to buffer
-
-    Return True if something was processed, or False of not
+    An escape starts an escape sequence in every mode.
     """
-    def pre_chout(self, ch, add_data):
-        # If we are in escape mode and the character is one of
-        # the secondary addresses
-        if ch == ESC:
-            self.esc = True
-            return True
-
-        if self.esc == True:
-            self.esc = False
-
-            if ch == 0x3f: # End of secondary address
-
-                # Get values for the command
-                data = self.get_number_values(self.secondary_address_data)
-                if len(data) == 0: data.append(0)
-
-                # Process X/Y plot
-                if self.xyplot == True:
-                    cmd = self.secondary_address_data.strip()[0]
-                    if len(data) == 1: data.append(0)
-                    if cmd == "H": # Move to start point (0,0)
-                        self.x = 0
-                        self.y = 0
-
-                    elif cmd == "I": # Set relative origin point (X0,Y0) = current (X,Y)
-                        self.set_rel_origin()
-
-                    elif cmd == "M": # Move to position (X,Y) relative to the absolute origin (0,0) (pen up)
-                        data[0] *= SIZE
-                        data[1] *= SIZE
-                        self.x = data[0]
-                        self.y = data[1]
-
-                    elif cmd == "D": # Draw to position (X,Y) relative to the absolute origin (0,0) (pen down)
-                        data[0] *= SIZE
-                        data[1] *= SIZE
-                        self.reset_scribe_state()
-                        self.draw_line(self.x, self.y, data[0], -data[1], self.colors[self.color % 4])
-                        self.x = data[0]
-                        self.y = -data[1]
-
-                    elif cmd == "R": # Move to position (X,Y) relative to the origin point (X0,Y0) (pen up)
-                        self.x = self.rel_origin_x + data[0]
-                        self.y = self.rel_origin_y + -data[1]
-
-                    elif cmd == "J": # Draw to position (X,Y) relative to the origin point (X0,Y0) (pen up)
-                        data[0] *= SIZE
-                        data[1] *= SIZE
-                        new_x = self.rel_origin_x + data[0]
-                        new_y = self.rel_origin_y + -data[1]
-                        self.reset_scribe_state()
-                        self.draw_line(self.x, self.y, new_x, new_y, self.colors[self.color % 4])
-                        self.x = new_x
-                        self.y = new_y
-
-                    self.xyplot = False
-
-                """
-                    switch (mps->command) {
-                    case 'H':       /* move to absolute origin */
-                        mps->cur_x = 0;
-                        mps->cur_y = 0;
-                        break;
-                    case 'I':       /* set relative origin here */
-                        set_rel_origin(mps);
-                        break;
-                    case 'M':       /* move to (x,y) relative to absolute origin */
-                        mps->cur_x = mps->command_x;
-                        mps->cur_y = mps->command_y;
-                        break;
-                    case 'R':       /* move to (x,y) relative to relative origin */
-                        mps->cur_x = mps->rel_origin_x + mps->command_x;
-                        mps->cur_y = mps->rel_origin_y + mps->command_y;
-                        break;
-                    case 'D':       /* draw to (x,y) relative to absolute origin */
-                        new_x = mps->command_x;
-                        new_y = mps->command_y;
-                        reset_scribe_state(mps);
-                        draw(mps, mps->cur_x, mps->cur_y, new_x, new_y);
-                        mps->cur_x = new_x;
-                        mps->cur_y = new_y;
-                        break;
-                    case 'J':       /* draw to (x,y) relative to relative origin */
-                        new_x = mps->rel_origin_x + mps->command_x;
-                        new_y = mps->rel_origin_y + mps->command_y;
-                        reset_scribe_state(mps);
-                        draw(mps, mps->cur_x, mps->cur_y, new_x, new_y);
-                        mps->cur_x = new_x;
-                        mps->cur_y = new_y;
-                        break;
-                """
-
-                # Process color
-                if self.select_color == True:
-                    self.color = data[0]
-                    self.select_color = False
-
-                # Process character size
-                if self.select_char_size == True:
-                    self.set_char_size(data[0])
-                    self.select_char_size = False
-
-                # Process character rotation
-                if self.char_rotation == True:
-                    self.char_rotation = False
-
-                # Process scribe line mode
-                if self.scribe_line_mode == True:
-                    self.scribe_line_mode = False
-
-                # Process set case
-                if self.set_case == True:
-                    self.set_char_case(data[0])
-                    self.set_case = False
-
-                return True
-
-            if ch == 1: # X/Y plot
-                self.xyplot = True
-                self.secondary_address_data = ""
-                return True
-
-            if ch == 2: # Select color
-                self.select_color = True
-                self.secondary_address_data = ""
-                return True
-
-            if ch == 3: # Select character size
-                self.select_char_size = True
-                self.secondary_address_data = ""
-                return True
-
-            if ch == 4: # Character rotation
-                self.char_rotation = True
-                self.secondary_address_data = ""
-                return True
-
-            if ch == 5: # Scribe line mode
-                self.scribe_line_mode = True
-                self.secondary_address_data = ""
-                return True
-
-            if ch == 6: # Upper/Lower Case
-                self.set_case = True
-                self.secondary_address_data = ""
-                return True
-
-            if ch == 7: # Reset Printer
-                return True
+    def dispatch_table(self):
+        if self.esc:
+            return self.get_table('esc', lambda: self.mode_table(self.end_escape, {
+                ESC: self.escape_escape,
+                0x3f: self.end_secondary_address,                  # End of secondary address
+                1: self.secondary_address_mode('xyplot'),           # X/Y plot
+                2: self.secondary_address_mode('select_color'),     # Select color
+                3: self.secondary_address_mode('select_char_size'), # Select character size
+                4: self.secondary_address_mode('char_rotation'),    # Character rotation
+                5: self.secondary_address_mode('scribe_line_mode'), # Scribe line mode
+                6: self.secondary_address_mode('set_case'),         # Upper/Lower Case
+                7: self.reset_printer                               # Reset Printer
+            }))
+
+        escape = {ESC: self.start_escape}
 
         # Escape an escape
         if self.esc_esc:
-            ch = ESC
-            self.esc_esc = False
-            return False
+            return self.get_table('esc_esc', lambda: self.mode_table(self.escaped_character, escape))
 
-        # If we are in any of the modes, append the
-        # character to the secondary address data
+        # If we are in any of the modes, the characters are
+        # the secondary address data
         if (    self.xyplot or
                 self.select_color or
                 self.select_char_size or
@@ -428,26 +282,168 @@ class vic1520(print_profile):
                 self.scribe_line_mode or
                 self.set_case
             ):
-            self.secondary_address_data += chr(ch)
-            return True
+            return self.get_table('data', lambda: self.mode_table(self.secondary_address_character, escape))
 
-        return False
+        table = self.normal_table()
+        return self.get_table(('text', id(table)), lambda: self.change_table(table, escape))
 
-    """
-    Called at the end of chout
+    def control_actions(self):
+        return {
+            FF: self.form_feed,
+            CR: self.carriage_return_character,
+            NL: self.carriage_return_character,
+            CR + 128: self.shift_carriage_return_character
+        }
 
-    ch - Character
-    add_data - Add to buffer
     """
-    def post_chout(self, ch, add_data):
-        if ch == FF:          # Form feed
-            self.parent.new_page()
+    Make a table entry for the start of a secondary address command
 
-        if ch == CR or ch == NL:
-            self.print_char_cr()
-
-        if ch == CR + 128:
-            self.print_char_shcr()
+    mode - Name of the flag of the command
+    """
+    def secondary_address_mode(self, mode):
+        def entry(ch, add_data):
+            self.esc = False
+            setattr(self, mode, True)
+            self.secondary_address_data = ""
+            self.mode_changed()
+        return entry
+
+    # End of secondary address, run the command
+    def end_secondary_address(self, ch, add_data):
+        self.esc = False
+        self.mode_changed()
+
+        # Get values for the command
+        data = self.get_number_values(self.secondary_address_data)
+        if len(data) == 0: data.append(0)
+
+        # Process X/Y plot
+        if self.xyplot == True:
+            cmd = self.secondary_address_data.strip()[0]
+            if len(data) == 1: data.append(0)
+            if cmd == "H": # Move to start point (0,0)
+                self.x = 0
+                self.y = 0
+
+            elif cmd == "I": # Set relative origin point (X0,Y0) = current (X,Y)
+                self.set_rel_origin()
+
+            elif cmd == "M": # Move to position (X,Y) relative to the absolute origin (0,0) (pen up)
+                data[0] *= SIZE
+                data[1] *= SIZE
+                self.x = data[0]
+                self.y = data[1]
+
+            elif cmd == "D": # Draw to position (X,Y) relative to the absolute origin (0,0) (pen down)
+                data[0] *= SIZE
+                data[1] *= SIZE
+                self.reset_scribe_state()
+                self.draw_line(self.x, self.y, data[0], -data[1], self.colors[self.color % 4])
+                self.x = data[0]
+                self.y = -data[1]
+
+            elif cmd == "R": # Move to position (X,Y) relative to the origin point (X0,Y0) (pen up)
+                self.x = self.rel_origin_x + data[0]
+                self.y = self.rel_origin_y + -data[1]
+
+            elif cmd == "J": # Draw to position (X,Y) relative to the origin point (X0,Y0) (pen up)
+                data[0] *= SIZE
+                data[1] *= SIZE
+                new_x = self.rel_origin_x + data[0]
+                new_y = self.rel_origin_y + -data[1]
+                self.reset_scribe_state()
+                self.draw_line(self.x, self.y, new_x, new_y, self.colors[self.color % 4])
+                self.x = new_x
+                self.y = new_y
+
+            self.xyplot = False
+
+        """
+            switch (mps->command) {
+            case 'H':       /* move to absolute origin */
+                mps->cur_x = 0;
+                mps->cur_y = 0;
+                break;
+            case 'I':       /* set relative origin here */
+                set_rel_origin(mps);
+                break;
+            case 'M':       /* move to (x,y) relative to absolute origin */
+                mps->cur_x = mps->command_x;
+                mps->cur_y = mps->command_y;
+                break;
+            case 'R':       /* move to (x,y) relative to relative origin */
+                mps->cur_x = mps->rel_origin_x + mps->command_x;
+                mps->cur_y = mps->rel_origin_y + mps->command_y;
+                break;
+            case 'D':       /* draw to (x,y) relative to absolute origin */
+                new_x = mps->command_x;
+                new_y = mps->command_y;
+                reset_scribe_state(mps);
+                draw(mps, mps->cur_x, mps->cur_y, new_x, new_y);
+                mps->cur_x = new_x;
+                mps->cur_y = new_y;
+                break;
+            case 'J':       /* draw to (x,y) relative to relative origin */
+                new_x = mps->rel_origin_x + mps->command_x;
+                new_y = mps->rel_origin_y + mps->command_y;
+                reset_scribe_state(mps);
+                draw(mps, mps->cur_x, mps->cur_y, new_x, new_y);
+                mps->cur_x = new_x;
+                mps->cur_y = new_y;
+                break;
+        """
+
+        # Process color
+        if self.select_color == True:
+            self.color = data[0]
+            self.select_color = False
+
+        # Process character size
+        if self.select_char_size == True:
+            self.set_char_size(data[0])
+            self.select_char_size = False
+
+        # Process character rotation, 0 is normal and
+        # anything else rotates 90 degrees to the right
+        if self.char_rotation == True:
+            self.rotated = data[0] != 0
+            self.char_rotation = False
+
+        # Process scribe line mode
+        if self.scribe_line_mode == True:
+            self.scribe_line_mode = False
+
+        # Process set case
+        if self.set_case == True:
+            self.set_char_case(data[0])
+            self.set_case = False
+
+
+    def reset_printer(self, ch, add_data):
+        self.esc = False
+        self.mode_changed()
+
+    # The character after an escape escape is printed, even in
+    # the secondary address modes
+    def escaped_character(self, ch, add_data):
+        # The escape is only over after the character is printed, so if it
+        # starts a new page, the page is saved in this mode (See new_page)
+        self.normal_table()[ch](ch, add_data)
+        self.esc_esc = False
+        self.mode_changed()
+
+    # Add the character to the secondary address data
+    def secondary_address_character(self, ch, add_data):
+        self.secondary_address_data += chr(ch)
+
+    def form_feed(self, ch, add_data):           # Form feed
+        self.parent.new_page()
+
+    def carriage_return_character(self, ch, add_data):
+        self.print_char_cr()
+
+    def shift_carriage_return_character(self, ch, add_data):
+        self.print_char_shcr()
 
     """
     Clear the output
@@ -455,3 +451,47 @@ class vic1520(print_profile):
     def clear_output(self):
         super().clear_output()
 
+"""
+Decode the lines of a character from the font
+
+Font format:
+
+%EXXXYYYP
+E - last command in list (1)
+X - x coordinate (0-7)
+Y - y coordinate (0-7)
+P - use pen (1), or just move (0)
+
+f - Character data
+mult - Scaling factor
+color - Color of the pen
+rotated - Rotate the character 90 degrees to the right, so the
+          top of the character is on the right
+
+Returns a list of (x1, y1, x2, y2, color), from the origin of the
+character, with y going up
+"""
+def decode_strokes(f, mult, color, rotated = False):
+    strokes = []
+
+    # Set start position
+    start_x = 0
+    start_y = 0
+
+    for i in f:
+        # Get the end position
+        end_x = ((i & 0x70) >> 4) * mult
+        end_y = ((i & 0x0e) >> 1) * mult
+
+        # If the low bit is set, we are drawing
+        if i & 1:
+            if rotated:
+                strokes.append((start_y, -start_x, end_y, -end_x, color))
+            else:
+                strokes.append((start_x, start_y, end_x, end_y, color))
+
+        # Make the last postions the first
+        start_x = end_x
+        start_y = end_y
+
+    return strokes
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import sys
+import os
+import getopt
+
+from printers.renderer import Renderer, PRINTERS
+from printers.printer_constants import OUTPUT_QUALITY, OUTPUT_RESOLUTION
+
+DEFAULT_PRINTER = "MPS 801"
+
+def display_help():
+    print ('render.py [-p <printer>] [-f <data file>] [-x <hex file>] [-j <processes>] [-d <dpi>] -o <output file>')
+    print ()
+    print ('Render printer data to a PDF file, without opening a window.')
+    print ('VIC 1520 plots can also be saved as SVG, by using the .svg extension.')
+    print ('Use the .tif or .tiff extension to save the pages as a TIFF file.')
+    print ('The pages are drawn in one process for each CPU, unless -j is given.')
+    print ('The resolution is a number of dots per inch, or one of', ', '.join(q.lower() for q in OUTPUT_QUALITY),
+        '(default {d}).'.format(d=OUTPUT_RESOLUTION))
+    print ()
+    print ('Printers:', ', '.join(PRINTERS))
+    sys.exit(2)
+
+def main(argv):
+    # Initialize the printer, data files, and output file
+    printer = DEFAULT_PRINTER
+    data_file = None
+    hex_file = None
+    output_file = None
+    processes = os.cpu_count() or 1
+    dpi = OUTPUT_RESOLUTION
+
+    # Parse the command line arguments, and display the help if there is an error
+    try:
+        opts, args = getopt.getopt(argv,"hp:f:x:o:j:d:",["printer=","file=","hex=","output=","jobs=","dpi="])
+    except getopt.GetoptError:
+        display_help()
+
+    # Read the command line arguments
+    for opt, arg in opts:
+        if opt == '-h':
+            display_help()
+        elif opt in ("-p", "--printer"):
+            printer = arg
+        elif opt in ("-f", "--file"):
+            data_file = arg
+        elif opt in ("-x", "--hex"):
+            hex_file = arg
+        elif opt in ("-o", "--output"):
+            output_file = arg
+        elif opt in ("-j", "--jobs"):
+            try:
+                processes = int(arg)
+            except ValueError:
+                display_help()
+        elif opt in ("-d", "--dpi"):
+            if arg.capitalize() in OUTPUT_QUALITY:
+                dpi = OUTPUT_QUALITY[arg.capitalize()]
+            else:
+                try:
+                    dpi = int(arg)
+                except ValueError:
+                    display_help()
+
+    if printer not in PRINTERS:
+        print("Unknown printer", printer)
+        exit(3)
+
+    # We need something to render, and somewhere to put it
+    if (data_file is None and hex_file is None) or output_file is None:
+        display_help()
+
+    for f in (data_file, hex_file):
+        if f is not None and not os.path.exists(f):
+            print("The data file", f, "does not exist")
+            exit(4)
+
+    d = os.path.dirname(output_file)
+    if d == '': d = "."
+    if not os.path.exists(d):
+        print("Directory for output file", d, "does not exist")
+        exit(5)
+
+    # Render the data and save it
+    renderer = Renderer()
+    renderer.select_printer(printer)
+    renderer.set_dpi(dpi)
+
+    if data_file is not None:
+        renderer.read_data_file(data_file)
+
+    if hex_file is not None:
+        renderer.read_hex_file(hex_file)
+
+    if output_file.lower().endswith('.svg'):
+        renderer.save_svg(output_file)
+    elif output_file.lower().endswith(('.tif', '.tiff')):
+        renderer.save_tiff(output_file)
+    else:
+        renderer.save_pdf(output_file, processes)
+        renderer.close_pdf()
+        renderer.close_pool()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,102 @@
+import re
+
+import pytest
+from PIL import ImageColor
+
+from printers.printer_constants import PAGE_SIZES, PEN_COLORS
+from printers.renderer import Renderer
+from printers.vector_export import STEP_POINTS
+from test_redraw import print_data
+
+"""
+Print the data and save it as a PDF file
+
+printer - Name of the printer
+data - Print data
+output_file - Path of the file
+processes - Number of processes to draw the pages in
+"""
+def save_pdf(printer, data, output_file, processes):
+    renderer = Renderer()
+    renderer.select_printer(printer)
+    renderer.write(data)
+    renderer.save_pdf(output_file, processes)
+    renderer.close_pdf()
+    renderer.close_pool()
+    return renderer.page_last
+
+@pytest.mark.parametrize('printer', ['MPS 801', 'MPS 802'])
+def test_parallel_pdf_matches_serial(printer, tmp_path):
+    data = print_data(1, 20000)
+
+    pages = save_pdf(printer, data, tmp_path / 'serial.pdf', 1)
+    save_pdf(printer, data, tmp_path / 'parallel.pdf', 2)
+
+    # The pages drawn in other processes are the same as the ones drawn here
+    assert pages > 1
+    assert (tmp_path / 'parallel.pdf').read_bytes() == (tmp_path / 'serial.pdf').read_bytes()
+
+def test_pdf_plot_fills_page(tmp_path):
+    renderer = Renderer()
+    renderer.select_printer('VIC 1520')
+    width, height = PAGE_SIZES['VIC 1520']
+
+    # Draw a line from the top left corner to the bottom right corner
+    renderer.write('\x1b\x01M 0 0\x1b?\x1b\x01D {w} -{h}\x1b?'.format(w=width, h=height).encode('ascii'))
+    renderer.save_pdf(tmp_path / 'plot.pdf')
+    renderer.close_pdf()
+
+    # Put the line through the transformation of the page
+    content = re.search(rb'stream\n(.*?)\nendstream', (tmp_path / 'plot.pdf').read_bytes(), re.S).group(1).decode('ascii')
+    a, b, c, d, e, f = (float(v) for v in re.search(r'(\S+) (\S+) (\S+) (\S+) (\S+) (\S+) cm', content).groups())
+    x1, y1, x2, y2 = (float(v) for v in re.search(r'(\S+) (\S+) m (\S+) (\S+) l', content).groups())
+
+    assert (a * x1 + e, d * y1 + f) == pytest.approx((0, height * STEP_POINTS), abs=0.01)
+    assert (a * x2 + e, d * y2 + f) == pytest.approx((width * STEP_POINTS, 0), abs=0.01)
+
+def test_plot_colors_match(tmp_path):
+    renderer = Renderer()
+    renderer.select_printer('VIC 1520')
+
+    # Draw a line across the page with the green pen
+    renderer.write(b'\x1b\x022\x1b?\x1b\x01M 0 0\x1b?\x1b\x01D 480 -100\x1b?')
+    r, g, b = ImageColor.getrgb(PEN_COLORS[2])
+    assert renderer.display_list.segments[-1][4] == PEN_COLORS[2]
+
+    # The saved pages use the same color as the window
+    image = renderer.page_image().convert('RGB')
+    assert set(image.getdata()) == {(255, 255, 255), (r, g, b)}
+
+    renderer.save_svg(tmp_path / 'plot.svg')
+    assert 'stroke="{c}"'.format(c=PEN_COLORS[2]) in (tmp_path / 'plot.svg').read_text()
+
+    renderer.save_pdf(tmp_path / 'plot.pdf')
+    renderer.close_pdf()
+    content = (tmp_path / 'plot.pdf').read_bytes()
+    rg = re.search(rb'(\S+) (\S+) (\S+) RG', content).groups()
+    assert [float(v) for v in rg] == pytest.approx([r / 255, g / 255, b / 255], abs=0.01)
+
+def test_pool_is_kept_between_saves(tmp_path):
+    data = print_data(1, 20000)
+
+    renderer = Renderer()
+    renderer.select_printer('MPS 801')
+    renderer.write(data)
+    assert renderer.unsaved_pdf_pages(tmp_path / 'first.pdf') == renderer.page_last
+
+    renderer.save_pdf(tmp_path / 'first.pdf', 2)
+    pool = renderer.pool
+    assert renderer.unsaved_pdf_pages(tmp_path / 'first.pdf') == 0
+
+    # Saving to another file draws the pages with the same processes
+    assert renderer.unsaved_pdf_pages(tmp_path / 'second.pdf') == renderer.page_last
+    renderer.save_pdf(tmp_path / 'second.pdf', 2)
+    assert renderer.pool is pool
+
+    renderer.close_pdf()
+    renderer.close_pool()
+    assert renderer.pool is None
+
+    save_pdf('MPS 801', data, tmp_path / 'serial.pdf', 1)
+    assert (tmp_path / 'first.pdf').read_bytes() == (tmp_path / 'serial.pdf').read_bytes()
+    assert (tmp_path / 'second.pdf').read_bytes() == (tmp_path / 'serial.pdf').read_bytes()
@@ -0,0 +1,116 @@
+import random
+
+import numpy as np
+import pytest
+
+from printers.printer_constants import SIZE
+from printers.renderer import Renderer
+
+# Bytes that change how the characters after them are printed
+SPECIAL = [8, 10, 13, 14, 15, 16, 17, 18, 26, 27, 34, 141, 145, 146, 147, 254]
+
+"""
+Make a stream of print data, mostly text, with enough lines for a few pages
+
+seed - Seed of the random numbers
+length - Number of bytes
+"""
+def print_data(seed, length):
+    rnd = random.Random(seed)
+    data = bytearray()
+    while len(data) < length:
+        r = rnd.random()
+        if r < 0.15:
+            data.append(rnd.choice(SPECIAL))
+        elif r < 0.25:
+            data.append(rnd.randrange(256))
+        else:
+            data += bytes(rnd.randint(32, 95) for _ in range(rnd.randint(1, 120)))
+    return bytes(data)
+
+"""
+Print the data, and get the dots and lines of every page as they were printed
+
+printer - Name of the printer
+data - Print data
+one_at_a_time - Send each byte with chout, instead of all of them with write
+"""
+def print_pages(printer, data, one_at_a_time):
+    renderer = Renderer(cache_size=1 << 40)
+    renderer.select_printer(printer)
+    if one_at_a_time:
+        for ch in data:
+            renderer.printer_profile.chout(ch)
+    else:
+        renderer.write(data)
+
+    # The finished pages were put in the cache when the next page started
+    pages = []
+    for page in range(renderer.page_last):
+        dots, lines = renderer.page_cache.get(page)
+        pages.append((dots.copy(), list(lines.segments)))
+    pages.append((renderer.dots.copy(), list(renderer.display_list.segments)))
+
+    return renderer, pages
+
+@pytest.mark.parametrize('printer', ['MPS 801', 'MPS 802', 'VIC 1520'])
+@pytest.mark.parametrize('one_at_a_time', [True, False])
+def test_redraw_matches_print(printer, one_at_a_time):
+    page_count = 0
+    for seed in range(6):
+        renderer, pages = print_pages(printer, print_data(seed, 20000), one_at_a_time)
+        page_count += len(pages)
+
+        # Draw every page again from its page data and saved state
+        for page, (dots, lines) in enumerate(pages):
+            renderer.page_current = page
+            renderer.clear_canvas()
+            renderer.draw_page_data()
+
+            assert np.array_equal(renderer.dots, dots), 'seed {s} page {p}'.format(s=seed, p=page)
+            assert renderer.display_list.segments == lines, 'seed {s} page {p}'.format(s=seed, p=page)
+
+    # Some of the pages need to start in the middle of the data
+    assert page_count > 6
+
+"""
+Make print data that fills a page, so the first character printed after
+the command starts a new page
+
+printer - Name of the printer
+command - Bytes sent after the page is full
+"""
+def page_break_data(printer, command):
+    renderer = Renderer()
+    renderer.select_printer(printer)
+    profile = renderer.printer_profile
+
+    # Print until the line and the page are full
+    count = 0
+    while not (profile.x >= profile.page_width * SIZE and
+               profile.y + profile.line_space * SIZE >= profile.page_height * SIZE):
+        profile.chout(ord('A'))
+        count += 1
+        assert count < 100000
+    return b'A' * count + command
+
+# An escape escape character starting a page while a command mode is on
+@pytest.mark.parametrize('printer, command, dots, segments', [
+    ('VIC 1520', b'\x1b\x01M\x1b\x1bB', 0, 10),
+    ('MPS 802', b'\x1b\x02\x1b\x1bB', 22, 0),
+])
+def test_redraw_escaped_page_break(printer, command, dots, segments):
+    renderer, pages = print_pages(printer, page_break_data(printer, command), True)
+    assert len(pages) > 1
+
+    # Only the escaped character is on the last page
+    live_dots, live_lines = pages[-1]
+    assert np.count_nonzero(live_dots) == dots
+    assert len(live_lines) == segments
+
+    renderer.page_current = renderer.page_last
+    renderer.clear_canvas()
+    renderer.draw_page_data()
+
+    assert np.array_equal(renderer.dots, live_dots)
+    assert renderer.display_list.segments == live_lines
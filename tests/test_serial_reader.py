@@ -0,0 +1,152 @@
+import random
+import threading
+import time
+
+from printers.serial_reader import ring_buffer, serial_reader
+
+"""
+Make random bytes
+
+seed - Seed of the random numbers
+length - Number of bytes
+"""
+def random_bytes(seed, length):
+    return random.Random(seed).randbytes(length)
+
+"""
+Read everything from a buffer or reader, a random amount at a time
+
+source - Ring buffer or serial reader
+length - Number of bytes to read
+rnd - Random numbers
+"""
+def read_all(source, length, rnd):
+    data = bytearray()
+    timeout = time.monotonic() + 30
+    while len(data) < length:
+        assert time.monotonic() < timeout, 'only read {n} bytes'.format(n=len(data))
+
+        chunk = source.read(rnd.randint(1, 1500))
+        if len(chunk) == 0:
+            time.sleep(0.001)
+        data += chunk
+    return bytes(data)
+
+def test_ring_buffer_wraparound():
+    rnd = random.Random(9)
+    data = random_bytes(10, 300 * 1024)
+    buffer = ring_buffer(1000)
+    stop = threading.Event()
+
+    # Writes and reads of random sizes, in one thread, so the reads start
+    # and end all over the buffer
+    written = 0
+    received = bytearray()
+    while len(received) < len(data):
+        # Only write what fits, so the write does not wait
+        count = rnd.randint(0, 1000 - len(buffer))
+        buffer.write(data[written:written + count], stop)
+        written = min(written + count, len(data))
+        assert len(buffer) == written - len(received)
+
+        received += buffer.read(rnd.randint(1, 1000))
+
+    assert received == data
+
+def test_ring_buffer_random():
+    rnd = random.Random(1)
+    data = random_bytes(2, 300 * 1024)
+    buffer = ring_buffer(1000)
+    stop = threading.Event()
+
+    # Write chunks smaller and bigger than the buffer, so it wraps around
+    # in the middle of writes and reads
+    def produce():
+        chunks = random.Random(3)
+        i = 0
+        while i < len(data):
+            count = chunks.randint(1, 2500)
+            buffer.write(data[i:i + count], stop)
+            i += count
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    received = read_all(buffer, len(data), rnd)
+    producer.join()
+
+    assert received == data
+    assert len(buffer) == 0
+    assert buffer.read(10) == b''
+
+def test_ring_buffer_stop():
+    buffer = ring_buffer(1000)
+    stop = threading.Event()
+
+    # The buffer fills up, and the writer waits until it is stopped
+    writer = threading.Thread(target=buffer.write, args=(bytes(1500), stop))
+    writer.start()
+    time.sleep(0.2)
+    assert writer.is_alive()
+    assert len(buffer) == 1000
+
+    stop.set()
+    writer.join(5)
+    assert not writer.is_alive()
+    assert len(buffer) == 1000
+
+"""
+Stand in for a serial port, that gives the data a few bytes at a time,
+like they arrive on the line
+"""
+class stand_in_port:
+    def __init__(self, data, seed):
+        self.data = data
+        self.position = 0
+        self.random = random.Random(seed)
+        self.timeout = None
+        self.in_waiting = 0
+
+    def read(self, count):
+        # Wait for the timeout when there is nothing more
+        if self.position == len(self.data):
+            time.sleep(self.timeout)
+            return b''
+
+        data = self.data[self.position:self.position + count]
+        self.position += len(data)
+
+        # Bytes that arrive while these are printed
+        self.in_waiting = min(self.random.randint(0, 3000), len(self.data) - self.position)
+        return data
+
+def test_serial_reader_random():
+    data = random_bytes(4, 300 * 1024)
+    reader = serial_reader(stand_in_port(data, 5), 1000)
+
+    received = read_all(reader, len(data), random.Random(6))
+    reader.stop()
+
+    assert received == data
+    assert not reader.thread.is_alive()
+    assert reader.error is None
+
+def test_serial_reader_stop_when_full():
+    reader = serial_reader(stand_in_port(bytes(5000), 7), 1000)
+
+    # Nothing is printed, so the thread waits for room in the buffer
+    time.sleep(0.2)
+    assert len(reader) == 1000
+
+    reader.stop()
+    assert not reader.thread.is_alive()
+
+def test_serial_reader_error():
+    class broken_port(stand_in_port):
+        def read(self, count):
+            raise OSError('port closed')
+
+    reader = serial_reader(broken_port(b'', 8), 1000)
+    reader.thread.join(5)
+
+    assert not reader.thread.is_alive()
+    assert str(reader.error) == 'port closed'